@@ -0,0 +1,81 @@
+# Local load test for the Telegram handlers: fires many simultaneous commands at the
+# handlers with fake Update/Context objects and reports p50/p95 reply latency.
+#
+#   DATA_SOURCE=csv python -m benchmarks.bot_load_test --users 50 --commands daily_sales top_products
+import argparse
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+os.environ.setdefault("DATA_SOURCE", "csv")
+
+from src.interfaces import telegram_bot
+
+
+class FakeMessage:
+    def __init__(self, replies):
+        self.replies = replies
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(("text", time.perf_counter()))
+
+    async def reply_photo(self, photo, **kwargs):
+        self.replies.append(("photo", time.perf_counter()))
+
+
+class FakeBot:
+    def __init__(self, replies):
+        self.replies = replies
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.replies.append(("text", time.perf_counter()))
+
+
+HANDLERS = {
+    "start": (telegram_bot.start, []),
+    "daily_sales": (telegram_bot.daily_sales, []),
+    "trend": (telegram_bot.trend, ["30"]),
+    "top_products": (telegram_bot.top_products, ["30"]),
+}
+
+async def one_request(chat_id, command):
+    handler, args = HANDLERS[command]
+    replies = []
+    update = SimpleNamespace(effective_chat=SimpleNamespace(id=chat_id), message=FakeMessage(replies))
+    context = SimpleNamespace(args=list(args), bot=FakeBot(replies))
+    started = time.perf_counter()
+    await handler(update, context)
+    return command, (replies[-1][1] if replies else time.perf_counter()) - started
+
+def percentiles(latencies):
+    values = np.array(latencies) * 1000
+    return {"n": len(values), "p50_ms": round(float(np.percentile(values, 50)), 2),
+            "p95_ms": round(float(np.percentile(values, 95)), 2), "max_ms": round(float(values.max()), 2)}
+
+async def run(users, commands, rounds):
+    results = {}
+    for _ in range(rounds):
+        # /start probes measure how responsive the bot stays while heavy commands run
+        tasks = [one_request(i, commands[i % len(commands)]) for i in range(users)]
+        tasks += [one_request(users + i, "start") for i in range(max(1, users // 10))]
+        for command, latency in await asyncio.gather(*tasks):
+            results.setdefault(command, []).append(latency)
+    return {command: percentiles(latencies) for command, latencies in results.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test for the Telegram bot handlers")
+    parser.add_argument("--users", type=int, default=50, help="simultaneous requests per round")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--commands", nargs="+", default=["daily_sales", "top_products"], choices=list(HANDLERS))
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.users, args.commands, args.rounds))
+    for command, stats in report.items():
+        print(f"/{command}: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# Cold-start import time per entry point, measured in a fresh interpreter with -X importtime.
+# Fails (exit code 1) when an entry point is over its budget or pulls in a heavy
+# library it doesn't need.
+#
+#   python -m benchmarks.import_time
+#   python -m benchmarks.import_time --budget cli=0.5 telegram_bot=1.0
+import argparse
+import re
+import subprocess
+import sys
+
+ENTRY_POINTS = {
+    "cli": "src.interfaces.cli",
+    "telegram_bot": "src.interfaces.telegram_bot",
+    "web_app": "src.interfaces.web_app",
+}
+
+# Seconds
+DEFAULT_BUDGETS = {"cli": 0.8, "telegram_bot": 1.5, "web_app": 3.0}
+
+# Libraries each entry point must not import at startup
+FORBIDDEN = {
+    "cli": ["streamlit", "plotly", "matplotlib", "gspread", "telegram"],
+    "telegram_bot": ["streamlit", "plotly", "matplotlib", "gspread"],
+    "web_app": ["plotly", "matplotlib", "gspread", "telegram"],
+}
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+# (total seconds, {top-level package: cumulative seconds}) for importing module
+def measure(module):
+    code = f"import {module}"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+
+    total = 0.0
+    packages = {}
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)) / 1e6, len(match.group(3)), match.group(4)
+        if indent == 1:
+            # Imports made directly by -c; together they are the whole import
+            total += cumulative
+        if "." not in name and not name.startswith("_"):
+            # A package is imported once, wherever it happens; this line includes its submodules
+            packages[name] = cumulative
+    packages.pop("src", None)
+    return total, packages
+
+def parse_budgets(values):
+    budgets = dict(DEFAULT_BUDGETS)
+    for value in values or []:
+        name, _, seconds = value.partition("=")
+        budgets[name] = float(seconds)
+    return budgets
+
+def main():
+    parser = argparse.ArgumentParser(description="Check cold-start import time of each entry point")
+    parser.add_argument("entry_points", nargs="*", choices=list(ENTRY_POINTS), help="default: all of them")
+    parser.add_argument("--budget", nargs="*", help="per entry point budget in seconds, e.g. cli=0.5")
+    parser.add_argument("--top", type=int, default=8, help="heaviest packages to list")
+    args = parser.parse_args()
+    budgets = parse_budgets(args.budget)
+
+    failed = False
+    for name in args.entry_points or list(ENTRY_POINTS):
+        try:
+            total, packages = measure(ENTRY_POINTS[name])
+        except RuntimeError as e:
+            print(f"{name}: {e}")
+            failed = True
+            continue
+
+        over_budget = total > budgets[name]
+        heavy = [package for package in FORBIDDEN[name] if package in packages]
+        status = "OK" if not over_budget and not heavy else "FAIL"
+        failed |= status == "FAIL"
+
+        print(f"{name}: {total:.3f}s (budget {budgets[name]:.2f}s) {status}")
+        for package, seconds in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"    {package:<24}{seconds:8.3f}s")
+        if heavy:
+            print(f"    imports unneeded libraries: {', '.join(heavy)}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
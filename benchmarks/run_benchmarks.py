@@ -0,0 +1,139 @@
+# Times the core paths on synthetic order tables and writes the results as JSON,
+# so runs from different commits can be compared.
+#
+#   python -m benchmarks.run_benchmarks --rows 10000 100000 1000000 --output bench.json
+#   python -m benchmarks.run_benchmarks --rows 100000 --compare bench.json
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from benchmarks.synthetic import generate_orders
+from src.core.analytics import sales_analysis, products_performance, top_customers, invalidate_rollup
+from src.core.data_processor import validate_data, update_total_cost_column, prepare_orders, save_to_sheets
+from src.core.data_sources import FakeWorksheet
+from src.core.memo import clear_results
+
+
+# Runs func(setup()) repeat times and returns the timings in seconds; setup isn't timed
+def measure(func, setup=None, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        started = time.perf_counter()
+        func(arg) if setup else func()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+def bench_size(rows, products, customers, error_rate, repeat):
+    raw = generate_orders(rows, products=products, customers=customers, error_rate=error_rate)
+    clean, errors = validate_data(raw)
+    with_totals = clean.copy()
+    update_total_cost_column(with_totals)
+    orders = prepare_orders(clean)
+    # Build the rollup up front so the warm cases measure queries only
+    sales_analysis(orders, time_period=30)
+
+    def cold(func):
+        # First call on a fresh frame, including the rollup build
+        def run(frame):
+            func(frame)
+        def setup():
+            clear_results()
+            return prepare_orders(clean)
+        return run, setup
+
+    def uncached(func):
+        # Query against the built rollup, with the result cache emptied before each run
+        return lambda _: func(), clear_results
+
+    cases = {
+        "validate_data": (lambda: validate_data(raw), None),
+        "update_total_cost_column": (update_total_cost_column, lambda: clean.copy()),
+        "prepare_orders": (lambda: prepare_orders(clean), None),
+        "sales_analysis_cold": cold(lambda frame: sales_analysis(frame, time_period=30)),
+        "sales_analysis_30d": uncached(lambda: sales_analysis(orders, time_period=30)),
+        "sales_analysis_30d_cached": (lambda: sales_analysis(orders, time_period=30), None),
+        "products_performance_cold": cold(lambda frame: products_performance(frame, time_period=30)),
+        "products_performance_30d": uncached(lambda: products_performance(orders, time_period=30)),
+        "products_performance_all": uncached(lambda: products_performance(orders)),
+        "top_customers": uncached(lambda: top_customers(orders)),
+        "top_customers_cached": (lambda: top_customers(orders), None),
+        "save_to_sheets_full": (lambda frame: save_to_sheets(frame, FakeWorksheet()), lambda: with_totals.copy()),
+        "save_to_sheets_diff": (lambda frame: save_to_sheets(frame, FakeWorksheet(), previous=clean), lambda: with_totals.copy()),
+    }
+
+    results = []
+    for name, (func, setup) in cases.items():
+        timings = measure(func, setup, repeat)
+        results.append({
+            "rows": rows,
+            "benchmark": name,
+            "seconds_min": round(min(timings), 6),
+            "seconds_median": round(statistics.median(timings), 6),
+        })
+        print(f"{rows:>10} {name:<28} {min(timings):10.4f}s")
+    invalidate_rollup()
+    clear_results()
+    return results
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+# Prints the ratio current / baseline for every benchmark present in both runs
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(r["rows"], r["benchmark"]): r for r in json.load(f)["results"]}
+    print("\nrows       benchmark                      baseline    current   ratio")
+    for r in results:
+        old = baseline.get((r["rows"], r["benchmark"]))
+        if old is None or not old["seconds_min"]:
+            continue
+        ratio = r["seconds_min"] / old["seconds_min"]
+        print(f"{r['rows']:>10} {r['benchmark']:<28} {old['seconds_min']:9.4f} {r['seconds_min']:9.4f} {ratio:7.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the core data paths on synthetic orders")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--customers", type=int, default=10_000)
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="JSON file from an earlier run to compare against")
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.rows:
+        results.extend(bench_size(rows, args.products, args.customers, args.error_rate, args.repeat))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "params": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
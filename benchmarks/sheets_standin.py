@@ -0,0 +1,203 @@
+# Local stand-in for the Google Sheets API, serving a FakeWorksheet over HTTP with added
+# latency and injected 429 responses, to exercise the shared client, the rate limiter and
+# the retries without touching a real spreadsheet.
+#
+#   python -m benchmarks.sheets_standin --rows 5000 --latency 0.05 --error-rate 0.3 --loads 20
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse, parse_qs
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from benchmarks.synthetic import generate_orders
+from src.core.data_sources import FakeWorksheet, GoogleSheetSource
+from src.core import sheets_client
+from src.utils import instrumentation
+from src.utils.config import Config
+
+SHEETS_API = "https://sheets.googleapis.com"
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, worksheet, latency=0.0, error_rate=0.0, seed=0):
+        super().__init__(("127.0.0.1", 0), StandinHandler)
+        self.worksheet = worksheet
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.stats = {"requests": 0, "throttled": 0, "connections": 0}
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse shows in the stats
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.stats["connections"] += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _throttled(self):
+        server = self.server
+        time.sleep(server.latency)
+        with server.lock:
+            server.stats["requests"] += 1
+            if server.random.random() < server.error_rate:
+                server.stats["throttled"] += 1
+                return True
+        return False
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _handle(self, method):
+        url = urlparse(self.path)
+        body = self._body() if method != "GET" else None
+        if self._throttled():
+            self._reply(429, {"error": {"code": 429, "message": "Quota exceeded (stand-in)", "status": "RESOURCE_EXHAUSTED"}})
+            return
+        # /v4/spreadsheets/<id>[/values/<range> | /values:batchGet | /values:batchUpdate]
+        parts = url.path.split("/", 4)
+        sheet = self.server.worksheet
+        rest = parts[4] if len(parts) > 4 else ""
+        if rest == "":
+            self._reply(200, metadata(sheet))
+        elif rest == "values:batchGet":
+            ranges = parse_qs(url.query).get("ranges", [])
+            self._reply(200, {"valueRanges": [{"range": r, "majorDimension": "ROWS", "values": read_range(sheet, r)} for r in ranges]})
+        elif rest == "values:batchUpdate":
+            for item in body.get("data", []):
+                sheet.update(item["values"], cell_range(item["range"]))
+            self._reply(200, {"totalUpdatedCells": sum(len(item["values"]) for item in body.get("data", []))})
+        elif rest.startswith("values/") and method == "GET":
+            range_name = unquote(rest[len("values/"):])
+            self._reply(200, {"range": range_name, "majorDimension": "ROWS", "values": read_range(sheet, range_name)})
+        elif rest.startswith("values/") and method == "PUT":
+            range_name = unquote(rest[len("values/"):])
+            sheet.update(body.get("values", []), cell_range(range_name))
+            self._reply(200, {"updatedRange": range_name})
+        else:
+            self._reply(404, {"error": {"code": 404, "message": f"Not found: {url.path}", "status": "NOT_FOUND"}})
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_POST(self):
+        self._handle("POST")
+
+
+def metadata(sheet):
+    grid = sheet.get_all_values()
+    return {
+        "spreadsheetId": "standin",
+        "properties": {"title": "Stand-in"},
+        "sheets": [{"properties": {
+            "sheetId": 0, "title": sheet.title, "index": 0, "sheetType": "GRID",
+            "gridProperties": {"rowCount": max(len(grid), 1000), "columnCount": max(map(len, grid), default=26)},
+        }}],
+    }
+
+# "'Sheet1'!A2:F100" -> "A2:F100"; a bare sheet name means the whole sheet
+def cell_range(range_name):
+    return range_name.split("!", 1)[1] if "!" in range_name else None
+
+def read_range(sheet, range_name):
+    cells = cell_range(range_name)
+    return sheet.get(cells) if cells else sheet.get_all_values()
+
+
+# Sends requests meant for the Sheets API to the stand-in instead
+class StandinAdapter(HTTPAdapter):
+    def __init__(self, base_url):
+        super().__init__()
+        self.base_url = base_url
+
+    def send(self, request, **kwargs):
+        request.url = request.url.replace(SHEETS_API, self.base_url, 1)
+        return super().send(request, **kwargs)
+
+def standin_session(base_url):
+    session = requests.Session()
+    session.mount(SHEETS_API, StandinAdapter(base_url))
+    return session
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load orders through a local Sheets API stand-in")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.3, help="share of requests answered with 429")
+    parser.add_argument("--loads", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=600, help="client rate limit, requests per minute")
+    parser.add_argument("--backoff", type=float, default=0.05, help="first backoff step in seconds")
+    args = parser.parse_args()
+
+    Config.SHEETS_BACKOFF_BASE = args.backoff
+    Config.SHEETS_RETRIES = 10
+    sheets_client.sheets_bucket = sheets_client.TokenBucket(args.rate / 60, Config.SHEETS_BURST)
+    instrumentation.enable()
+
+    orders = generate_orders(args.rows)
+    server = StandinServer(FakeWorksheet(orders), latency=args.latency, error_rate=args.error_rate).start()
+    source = GoogleSheetSource(spreadsheet_key="standin", session=standin_session(server.url))
+
+    def timed_load(_):
+        started = time.perf_counter()
+        df, _ = source.load()
+        return time.perf_counter() - started, len(df)
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(timed_load, range(args.loads)))
+    server.shutdown()
+
+    latencies = np.array([seconds for seconds, _ in results]) * 1000
+    counters = instrumentation.metrics.snapshot()["counters"]
+    report = {
+        "loads": args.loads,
+        "rows_per_load": sorted({rows for _, rows in results}),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 1),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 1),
+        "server_requests": server.stats["requests"],
+        "server_429": server.stats["throttled"],
+        "server_connections": server.stats["connections"],
+        "client_retries": counters.get("sheets.retries", 0),
+        "client_throttled_seconds": round(counters.get("sheets.throttled_seconds", 0), 2),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# Deterministic generator of order tables shaped like the sheet
+# (OrderID, CustomerName, Product, Quantity, Price, Date), values typed the way
+# get_all_records returns them: ints, strings and "" for blank cells.
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["OrderID", "CustomerName", "Product", "Quantity", "Price", "Date"]
+
+
+def generate_orders(rows, products=50, customers=1000, error_rate=0.0, days=365, end_date=None, seed=0):
+    rng = np.random.default_rng(seed)
+    end_date = pd.Timestamp(end_date or pd.Timestamp.now()).normalize()
+
+    product_names = np.array([f"Product {i:04d}" for i in range(products)], dtype=object)
+    customer_names = np.array([f"Customer {i:06d}" for i in range(customers)], dtype=object)
+    day_labels = pd.date_range(end=end_date, periods=days, freq="D").strftime("%Y-%m-%d").to_numpy(dtype=object)
+    # Every product has a fixed list price, so revenue per product is stable across sizes
+    list_prices = rng.integers(10, 3000, products)
+
+    product_codes = rng.integers(0, products, rows)
+    df = pd.DataFrame({
+        "OrderID": np.arange(1, rows + 1),
+        "CustomerName": customer_names[rng.integers(0, customers, rows)],
+        "Product": product_names[product_codes],
+        "Quantity": rng.integers(1, 10, rows),
+        "Price": list_prices[product_codes],
+        "Date": day_labels[np.sort(rng.integers(0, days, rows))],
+    })
+    if error_rate > 0:
+        inject_errors(df, error_rate, rng)
+    return df
+
+
+# Breaks about error_rate of the rows with the kinds of mistakes validate_data flags
+def inject_errors(df, error_rate, rng):
+    broken = np.flatnonzero(rng.random(len(df)) < error_rate)
+    kinds = rng.integers(0, 6, len(broken))
+
+    for col in ["OrderID", "Product", "Quantity", "Date"]:
+        df[col] = df[col].astype(object)
+
+    df.loc[broken[kinds == 0], "Quantity"] = ""
+    df.loc[broken[kinds == 1], "Quantity"] = 0
+    df.loc[broken[kinds == 2], "Price"] = -1
+    df.loc[broken[kinds == 3], "Date"] = "not a date"
+    df.loc[broken[kinds == 4], "Product"] = None
+    df.loc[broken[kinds == 5], "OrderID"] = ""
+    return df
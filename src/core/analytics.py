@@ -1,22 +1,259 @@
-import gspread
-from google.oauth2.service_account import Credentials
 import pandas as pd
+import numpy as np
+import weakref
+import copy
 from datetime import date, datetime, timedelta
-import os
-from dotenv import load_dotenv
-import matplotlib.pyplot as plt
-import plotly.express as px
 
 # for tests purpose
 from src.core.data_loader import load_data
-from src.core.data_processor import validate_data
+from src.core.data_processor import validate_data, is_prepared, prepare_orders, dataset_fingerprint, chain_fingerprint
+from src.core.memo import memoized
+from src.utils.instrumentation import span, timed
+
+
+# Per-day totals of an order table plus its rows ordered by date. A time window becomes a
+# binary search over the days; its rows are then taken in table order and summed the way
+# the full-table scan sums them, so money totals come out identical to the last digit.
+class DailyRollup:
+    def __init__(self, df):
+        self._bind(df)
+        self.daily = self.rows.groupby("Date")["Total cost"].sum()
+        self._build_index()
+
+    # The columns the windows read, without copying them
+    def _bind(self, df):
+        self.rows = pd.DataFrame({
+            "Date": df["Date"] if is_prepared(df) else pd.to_datetime(df["Date"]),
+            "Product": df["Product"],
+            "Quantity": df["Quantity"],
+            "OrderID": df["OrderID"],
+            "Total cost": df["Total cost"],
+        })
+        products = self.rows["Product"]
+        if isinstance(products.dtype, pd.CategoricalDtype):
+            self.product_codes, self.product_names = products.cat.codes.to_numpy(), products.cat.categories
+        else:
+            self.product_codes, self.product_names = pd.factorize(products, sort=True)
+
+    def _build_index(self):
+        self.days = self.daily.index.to_numpy()
+        self.day_totals = self.daily.to_numpy()
+        self.whole_days = bool((self.days == self.days.astype("datetime64[D]")).all())
+        self.prefix = np.concatenate((np.zeros(1, dtype=self.day_totals.dtype), np.cumsum(self.day_totals)))
+
+        # Row positions sorted by date (ties in table order, undated rows last) and where
+        # each day's rows start in that order
+        dates = self.rows["Date"].to_numpy()
+        self.order = np.argsort(dates, kind="stable")
+        starts = np.searchsorted(dates[self.order], self.days, side="left")
+        self.day_offsets = np.append(starts, len(dates) - np.isnat(dates).sum())
+
+    # Takes in the rows appended to the table; combined is the whole table with them at the
+    # end. Only the days that got new orders are summed again, over all their rows in order.
+    def append(self, combined):
+        old_days, old_order, old_offsets, old_rows = self.days, self.order, self.day_offsets, len(self.rows)
+        self._bind(combined)
+        new_dates = self.rows["Date"].to_numpy()[old_rows:]
+        touched = np.unique(new_dates[~np.isnat(new_dates)])
+
+        known = np.isin(old_days, touched)
+        positions = [old_order[old_offsets[i]:old_offsets[i + 1]] for i in np.flatnonzero(known)]
+        positions.append(old_rows + np.flatnonzero(np.isin(new_dates, touched)))
+        positions = np.sort(np.concatenate(positions))
+        recounted = self.rows.take(positions).groupby("Date")["Total cost"].sum()
+        self.daily = pd.concat([self.daily[~known], recounted]).sort_index()
+        self._build_index()
+        return self
+
+    # Day positions [start, stop) for a window, matching the filters in sales_analysis
+    def window(self, start_date=None, end_date=None):
+        start = 0 if start_date is None else np.searchsorted(self.days, np.datetime64(pd.Timestamp(start_date)), side="left")
+        stop = len(self.days) if end_date is None else np.searchsorted(self.days, np.datetime64(pd.Timestamp(end_date)), side="right")
+        return int(start), int(max(start, stop))
+
+    # Positions of the rows of days [start, stop), in table order
+    def positions(self, start, stop):
+        return np.sort(self.order[self.day_offsets[start]:self.day_offsets[stop]])
+
+    def _column(self, column, positions):
+        return pd.Series(self.rows[column].to_numpy()[positions])
+
+    def sales(self, start, stop):
+        sales_daily = pd.DataFrame({"Date": self.days[start:stop], "Total cost": self.day_totals[start:stop]})
+        total_cost = self._column("Total cost", self.positions(start, stop)).sum()
+        return sales_daily, total_cost
+
+    # Grouped by product code like the scan groups by name: same rows, same order, same sums
+    def products_in(self, start, stop, include_undated=False):
+        positions = np.arange(len(self.rows)) if include_undated else self.positions(start, stop)
+        codes = self.product_codes[positions]
+        # Orders without a product (code -1) aren't counted, as groupby drops missing keys
+        positions, codes = positions[codes >= 0], codes[codes >= 0]
+        result = pd.DataFrame({
+            # Prepared frames store small integer types; sums need the full width
+            "total_quantity": _widen(self._column("Quantity", positions)).groupby(codes).sum(),
+            "num_orders": self._column("OrderID", positions).groupby(codes).count(),
+            "total_revenue": self._column("Total cost", positions).groupby(codes).sum(),
+        })
+        result.index = pd.Index(self.product_names[result.index], name="Product")
+        return result
+
+
+def _widen(values):
+    return values.astype("int64") if pd.api.types.is_integer_dtype(values) else values
+
+# Categorical values (prepared frames) back to their plain dtype, so results look the
+# same whichever frame they were computed from
+def _plain(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.astype(values.dtype.categories.dtype)
+    return values
+
+# Prepared frames are used as they are; anything else is copied with parsed dates
+def _as_orders(df):
+    if is_prepared(df):
+        return df
+    df_copy = df.copy()
+    df_copy["Date"] = pd.to_datetime(df_copy["Date"])
+    return df_copy
+
+
+# Per-frame state (rollup, customer aggregates, content fingerprint) of prepared frames, kept until the frame is
+# dropped or its shape changes. Prepared frames are never modified in place; any other frame
+# may be (e.g. by update_total_cost_column), so it gets fresh state on every call.
+_frames = {}
+
+def _frame_signature(df):
+    return len(df), tuple(df.columns)
+
+def _frame_state(df):
+    if not is_prepared(df):
+        return {}
+    key = id(df)
+    cached = _frames.get(key)
+    if cached is not None and cached[0]() is df and cached[1] == _frame_signature(df):
+        return cached[2]
+    state = {}
+    ref = weakref.ref(df, lambda _, key=key: _frames.pop(key, None))
+    _frames[key] = (ref, _frame_signature(df), state)
+    return state
+
+def _supports_rollup(df):
+    columns = ["Date", "Product", "Quantity", "OrderID", "Total cost"]
+    if any(col not in df.columns for col in columns):
+        return False
+    return all(pd.api.types.is_numeric_dtype(df[col]) for col in ["Quantity", "Total cost"])
+
+# Rollup for a prepared frame, built on first use and reused until the frame is dropped.
+# Returns None for other frames and frames that can't be indexed; callers then scan the table.
+def get_rollup(df):
+    if not is_prepared(df):
+        return None
+    state = _frame_state(df)
+    if "rollup" not in state:
+        if not _supports_rollup(df):
+            return None
+        with span("analytics.rollup_build"):
+            state["rollup"] = DailyRollup(df)
+    return state["rollup"]
+
+# Per-customer aggregates (num_orders, orders_cost, last_order) of a prepared frame, built
+# once like the rollup. Returns None for other frames; customer_totals then scans the table.
+def get_customer_aggregates(df):
+    if not is_prepared(df) or "CustomerName" not in df.columns:
+        return None
+    state = _frame_state(df)
+    if "customers" not in state:
+        with span("analytics.customers_build"):
+            state["customers"] = _aggregate_customers(df)
+    return state["customers"]
+
+def register_rollup(df, rollup):
+    _frame_state(df)["rollup"] = rollup
+
+def invalidate_rollup(df=None):
+    if df is None:
+        _frames.clear()
+    else:
+        _frames.pop(id(df), None)
+
+# Content hash of the frame, computed once per prepared frame (on every call for others)
+def frame_fingerprint(df):
+    state = _frame_state(df)
+    if "fingerprint" not in state:
+        with span("analytics.fingerprint"):
+            state["fingerprint"] = dataset_fingerprint(df)
+    return state["fingerprint"]
+
+# Carries the rollup and fingerprint of df over to new_df = df + new_rows (both prepared),
+# folding in only the new rows. Nothing that hasn't been built for df is built here.
+# Customer aggregates are rebuilt on first use: merging their money sums wouldn't give
+# the same digits as summing the rows.
+def extend_frame_state(df, new_df, new_rows):
+    state = _frame_state(df)
+    new_state = _frame_state(new_df)
+    if state.get("rollup") is not None:
+        with span("analytics.rollup_append"):
+            # append replaces the rollup's tables, so the copy leaves df's rollup untouched
+            new_state["rollup"] = copy.copy(state["rollup"]).append(new_df)
+    if "fingerprint" in state:
+        new_state["fingerprint"] = chain_fingerprint(state["fingerprint"], new_rows)
+
+# Memo keys. A relative window ("last N days") is resolved against the current time to
+# the rollup's day positions, so the key names exactly the days the result covers and
+# rolls over by itself when a new day enters the window. Calls the functions would
+# reject aren't cached, and neither are frames that aren't prepared: they may be changed
+# in place, which their fingerprint wouldn't follow.
+def _window_key(df, time_period=None, start_date=None, end_date=None):
+    if not is_prepared(df):
+        return None
+    if time_period is not None and (start_date is not None or end_date is not None):
+        return None
+    rollup = get_rollup(df)
+    if rollup is None:
+        return None
+    if time_period:
+        if time_period < 0:
+            return None
+        window = rollup.window(start_date=datetime.now() - timedelta(time_period))
+    elif start_date and end_date:
+        start_date, end_date = pd.to_datetime(start_date), pd.to_datetime(end_date)
+        if start_date > end_date:
+            return None
+        window = rollup.window(start_date=start_date, end_date=end_date)
+    else:
+        window = "all"
+    return window, frame_fingerprint(df)
+
+# days_since_last_order only changes at midnight when every order date is a whole day
+def _customers_key(df):
+    if not is_prepared(df):
+        return None
+    rollup = get_rollup(df)
+    if rollup is None or "CustomerName" not in df.columns or not rollup.whole_days:
+        return None
+    return date.today(), frame_fingerprint(df)
+
+def _trend_key(df, days=None, windows=(7, 30, 90), rolling=(7,)):
+    if not is_prepared(df):
+        return None
+    rollup = get_rollup(df)
+    if rollup is None or min(windows, default=0) <= 0:
+        return None
+    now = datetime.now()
+    windows, rolling = tuple(sorted(set(windows))), tuple(sorted(set(rolling)))
+    starts = tuple(rollup.window(start_date=now - timedelta(days * k))[0] for k in (1, 2) for days in windows)
+    return days, windows, rolling, starts, date.today(), frame_fingerprint(df)
 
 def generate_diagram(title, data):
+    # plotly is only loaded when a diagram is actually drawn
+    import plotly.express as px
     fig = px.line(data, x=data.index, y="Total cost", title=f"title")
     fig.show()
     return fig
 
 # Daily sales raport
+@timed("analytics.get_daily_sales")
 def get_daily_sales(df):
     daily_sales = df.groupby("Date")["Total cost"].sum()
 
@@ -28,10 +265,9 @@ def get_daily_sales(df):
     return daily_sales
 
 # Sales analysis; define time period in days or start and end date of time you are interested in
+@timed("analytics.sales_analysis")
+@memoized("sales_analysis", _window_key)
 def sales_analysis(df, time_period=None, start_date=None, end_date=None):
-    df_copy = df.copy()
-    df_copy["Date"] = pd.to_datetime(df_copy["Date"])
-
     if time_period is not None and (start_date is not None or end_date is not None):
         raise ValueError("You can check the time period or results from a specific date to a specific date, not all at once.")
     if time_period is not None and time_period < 0:
@@ -39,6 +275,25 @@ def sales_analysis(df, time_period=None, start_date=None, end_date=None):
     if start_date and end_date and start_date > end_date:
         raise ValueError("Start date must be earlier than end date.")
 
+    rollup = get_rollup(df)
+    if rollup is None:
+        return _scan_sales_analysis(df, time_period, start_date, end_date)
+
+    if time_period:
+        start, stop = rollup.window(start_date=datetime.now() - timedelta(time_period))
+    elif start_date and end_date:
+        start, stop = rollup.window(start_date=pd.to_datetime(start_date), end_date=pd.to_datetime(end_date))
+    else:
+        raise ValueError("You must provide either time_period OR start_date and end_date.")
+
+    if start == stop:
+        raise ValueError("There is no data to show in chosen time period")
+    return rollup.sales(start, stop)
+
+# Full-table version of sales_analysis, used when no rollup can be built
+def _scan_sales_analysis(df, time_period=None, start_date=None, end_date=None):
+    df_copy = _as_orders(df)
+
     if time_period:
         # time_period = 30
         start_date = datetime.now() - timedelta(time_period)
@@ -67,16 +322,93 @@ def sales_analysis(df, time_period=None, start_date=None, end_date=None):
         raise ValueError("You must provide either time_period OR start_date and end_date.")
 
 
+# Sales over several "last N days" windows at once: (trend, windows).
+# trend has one row per calendar day for the last `days` days (default: the longest window),
+# with days without orders as 0 and a rolling mean column avg_<r>d for each r in rolling.
+# windows has, per window, the total (sales_analysis(df, time_period=N), up to float rounding:
+# it comes from running sums over the days), the total of the N days before it, the change
+# between the two and the average per day.
+@timed("analytics.sales_trend")
+@memoized("sales_trend", _trend_key)
+def sales_trend(df, days=None, windows=(7, 30, 90), rolling=(7,)):
+    windows = sorted(set(windows))
+    rolling = sorted(set(rolling))
+    if not windows or windows[0] <= 0 or (rolling and rolling[0] <= 0):
+        raise ValueError("Windows and rolling periods must be positive numbers of days.")
+    days = days or windows[-1]
+
+    rollup = get_rollup(df)
+    if rollup is not None:
+        dates, totals, prefix = rollup.days, rollup.day_totals, rollup.prefix
+    else:
+        daily = _as_orders(df).groupby("Date")["Total cost"].sum()
+        dates, totals = daily.index.to_numpy(), daily.to_numpy()
+        prefix = np.concatenate((np.zeros(1, dtype=totals.dtype), np.cumsum(totals)))
+
+    # Current windows start at now - N days, previous ones at now - 2N; one binary search for all
+    now = datetime.now()
+    bounds = [np.datetime64(pd.Timestamp(now - timedelta(w * k))) for k in (1, 2) for w in windows]
+    starts = np.searchsorted(dates, np.array(bounds), side="left")
+    current = prefix[-1] - prefix[starts[:len(windows)]]
+    previous = prefix[starts[:len(windows)]] - prefix[starts[len(windows):]]
+    change = current - previous
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change_pct = np.where(previous != 0, change / previous * 100, np.nan)
+    window_table = pd.DataFrame({
+        "total": current,
+        "previous": previous,
+        "change": change,
+        "change_pct": change_pct,
+        "daily_avg": current / np.array(windows),
+    }, index=pd.Index(windows, name="days"))
+
+    # Daily series from the first day the rolling means need up to today, gaps filled with 0
+    today = pd.Timestamp(now).normalize()
+    first = today - pd.Timedelta(days=days - 1 + (rolling[-1] - 1 if rolling else 0))
+    lo, hi = np.searchsorted(dates, [np.datetime64(first), np.datetime64(today + pd.Timedelta(days=1))], side="left")
+    if not (dates[lo:hi] >= np.datetime64(today - pd.Timedelta(days=days - 1))).any():
+        raise ValueError("There is no data to show in chosen time period")
+    series = (pd.Series(totals[lo:hi], index=pd.DatetimeIndex(dates[lo:hi]).floor("D"))
+              .groupby(level=0).sum()
+              .reindex(pd.date_range(first, today, freq="D"), fill_value=0))
+
+    trend = pd.DataFrame({"Total cost": series})
+    for r in rolling:
+        trend[f"avg_{r}d"] = series.rolling(r, min_periods=1).mean()
+    trend = trend.iloc[-days:].rename_axis("Date").reset_index()
+    return trend, window_table
+
 # Product performance analysis; define time period in days or start and end date of time you are interested in
+@timed("analytics.products_performance")
+@memoized("products_performance", _window_key)
 def products_performance(df, time_period=None, start_date=None, end_date=None):
-    df_copy = df.copy()
-    df_copy["Date"] = pd.to_datetime(df_copy["Date"])
+    top_products = product_totals(df, time_period, start_date, end_date)
+    top_products = top_products.sort_values(by="total_quantity", ascending=False)
+    return top_products
 
+# Per-product aggregates for the window, in product name order (not ranked)
+def product_totals(df, time_period=None, start_date=None, end_date=None):
     if time_period and (start_date or end_date):
         raise ValueError("Podaj albo time_period, albo start_date i end_date, nie oba naraz")
 
-    if time_period:
+    rollup = get_rollup(df)
+    if rollup is None:
+        return _scan_products(df, time_period, start_date, end_date)
+    elif time_period:
         # time_period = 30
+        start, stop = rollup.window(start_date=datetime.now() - timedelta(time_period))
+        return rollup.products_in(start, stop)
+    elif start_date and end_date:
+        start, stop = rollup.window(start_date=pd.to_datetime(start_date), end_date=pd.to_datetime(end_date))
+        return rollup.products_in(start, stop)
+    else:
+        return rollup.products_in(0, len(rollup.days), include_undated=True)
+
+# Full-table product aggregation, used when no rollup can be built
+def _scan_products(df, time_period=None, start_date=None, end_date=None):
+    df_copy = _as_orders(df)
+
+    if time_period:
         start_date = datetime.now() - timedelta(time_period)
         products_within_dates = df_copy[df_copy["Date"] >= start_date]
     elif start_date and end_date:
@@ -86,29 +418,184 @@ def products_performance(df, time_period=None, start_date=None, end_date=None):
     else:
         products_within_dates = df_copy
 
-    top_products = products_within_dates.groupby("Product").agg(
+    return products_within_dates.groupby("Product", observed=True).agg(
         total_quantity=("Quantity", "sum"),
         num_orders=("OrderID", "count"),
         total_revenue=("Total cost", "sum")
     )
-    top_products = top_products.sort_values(by="total_quantity", ascending=False)
-    return top_products
 
 # Top customers analysis
+@timed("analytics.top_customers")
+@memoized("top_customers", _customers_key)
 def top_customers(df):
-    df_copy = df.copy()
-    df_copy["Date"] = pd.to_datetime(df_copy["Date"])
+    top_customers = customer_totals(df).sort_values(by="num_orders", ascending=False)
+    return top_customers
+
+# Per-customer aggregates in customer name order (not ranked)
+def customer_totals(df):
+    aggregates = get_customer_aggregates(df)
+    if aggregates is None:
+        aggregates = _aggregate_customers(_as_orders(df))
+
+    top_customers = aggregates.drop(columns="last_order")
+    top_customers["days_since_last_order"] = (datetime.now() - pd.to_datetime(aggregates["last_order"])).dt.days
+    return top_customers
 
-    top_customers = df_copy.groupby("CustomerName").agg(
+def _aggregate_customers(df):
+    aggregates = df.groupby("CustomerName", observed=True).agg(
         num_orders = ("OrderID", "count"),
         orders_cost = ("Total cost", "sum"),
         last_order = ("Date", "max")
     )
+    aggregates.index = _plain(aggregates.index)
+    return aggregates
 
-    top_customers["days_since_last_order"] = (datetime.now() - pd.to_datetime(top_customers["last_order"])).dt.days
-    top_customers = top_customers.drop(columns="last_order").sort_values(by="num_orders", ascending=False)
+# Daily totals as get_daily_sales returns them, without its diagram prompt
+def daily_totals(df):
+    rollup = get_rollup(df)
+    if rollup is None:
+        return df.groupby("Date")["Total cost"].sum()
+    return rollup.daily.copy()
 
-    return top_customers
+DASHBOARD_VIEWS = {
+    "daily": daily_totals,
+    "sales": sales_analysis,
+    "trend": sales_trend,
+    "products": products_performance,
+    "customers": top_customers,
+}
+
+# Several views of the same orders at once. views maps a result name to (view, params),
+# e.g. {"sales_30d": ("sales", {"time_period": 30}), "top": ("products", {})}, with view one
+# of DASHBOARD_VIEWS. The frame is prepared once, then indexed by date and (with a customers
+# view) aggregated per customer once; every view is answered from those shared tables.
+# daily, sales, products and customers match a full-table scan exactly, money columns
+# included; trend's window totals match sales up to float rounding (see sales_trend).
+# A view that can't be computed (e.g. no orders in its window) holds its ValueError.
+@timed("analytics.dashboard")
+def dashboard(df, views):
+    unknown = [kind for kind, _ in views.values() if kind not in DASHBOARD_VIEWS]
+    if unknown:
+        raise ValueError(f"Unknown views: {unknown}. Choose from: {list(DASHBOARD_VIEWS)}")
+
+    orders = prepare_orders(df)
+    get_rollup(orders)
+    if any(kind == "customers" for kind, _ in views.values()):
+        get_customer_aggregates(orders)
+    results = {}
+    for name, (kind, params) in views.items():
+        try:
+            results[name] = DASHBOARD_VIEWS[kind](orders, **params)
+        except ValueError as e:
+            results[name] = e
+    return results
+
+# Rows offset..offset+n of table ranked by column `by` (largest first unless ascending).
+# Uses partial selection, so only the rows up to the requested page get sorted.
+# Ties keep the table's order; missing values rank last.
+def top_n(table, n=10, by=None, offset=0, ascending=False):
+    if by not in table.columns:
+        raise ValueError(f"Can't rank by {by}. Choose one of: {list(table.columns)}")
+    if n < 1 or offset < 0:
+        raise ValueError("n must be positive and offset can't be negative.")
+
+    key = table[by].to_numpy(dtype=float, na_value=np.nan)
+    return table.iloc[_rank_positions(key, n, offset, ascending)]
+
+# Positions of ranks offset..offset+n when sorting by key (a float array, NaN last)
+def _rank_positions(key, n, offset=0, ascending=True):
+    k = min(offset + n, len(key))
+    if k == 0 or offset >= len(key):
+        return np.empty(0, dtype=np.intp)
+
+    if not ascending:
+        key = -key
+    key = np.where(np.isnan(key), np.inf, key)
+
+    if k < len(key):
+        # Everything up to the k-th smallest key, ties at the boundary included
+        kth = np.partition(key, k - 1)[k - 1]
+        candidates = np.flatnonzero(key <= kth)
+    else:
+        candidates = np.arange(len(key))
+    ranked = candidates[np.lexsort((candidates, key[candidates]))]
+    return ranked[offset:k]
+
+# Float sort key for any column: numbers as they are, dates as timestamps, categories by
+# their (sorted) category order, other text by its rank; missing values become NaN
+def _sort_key(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        if not values.cat.ordered and not values.cat.categories.is_monotonic_increasing:
+            values = values.cat.reorder_categories(values.cat.categories.sort_values())
+        codes = values.cat.codes.to_numpy()
+        return np.where(codes < 0, np.nan, codes.astype(float))
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return np.where(values.isna().to_numpy(), np.nan, values.to_numpy().astype("int64").astype(float))
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.to_numpy(dtype=float, na_value=np.nan)
+    codes, _ = pd.factorize(values.astype(str).where(values.notna()), sort=True)
+    return np.where(codes < 0, np.nan, codes.astype(float))
+
+def _has_error(flags):
+    if isinstance(flags.dtype, pd.CategoricalDtype):
+        # Checked once per distinct message; code -1 (missing) picks the appended False
+        per_category = np.append(flags.cat.categories.to_numpy() != "", False)
+        return per_category[flags.cat.codes.to_numpy()]
+    return (flags.notna() & (flags.astype(str) != "")).to_numpy()
+
+# Rows whose value is one of `wanted`. Categorical columns are matched per category and the
+# result looked up by code, which stays fast however many names are wanted.
+def _is_in(values, wanted):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        positions = values.cat.categories.get_indexer(pd.Index(wanted).unique())
+        per_category = np.zeros(len(values.cat.categories) + 1, dtype=bool)
+        per_category[positions[positions >= 0]] = True
+        return per_category[values.cat.codes.to_numpy()]
+    return values.isin(wanted).to_numpy()
+
+# One page of the order table: (page, number of matching rows). Filters are a date range,
+# product and customer names and error rows only; only the rows of the page are copied,
+# and sorting selects just the rows up to the page (see top_n).
+@timed("analytics.orders_page")
+def orders_page(df, start_date=None, end_date=None, products=None, customers=None, errors_only=False,
+                sort_by=None, ascending=True, offset=0, limit=50):
+    if limit < 1 or offset < 0:
+        raise ValueError("limit must be positive and offset can't be negative.")
+    if sort_by is not None and sort_by not in df.columns:
+        raise ValueError(f"Can't sort by {sort_by}. Choose one of: {list(df.columns)}")
+    orders = _as_orders(df)
+
+    mask = np.ones(len(orders), dtype=bool)
+    if start_date is not None:
+        mask &= (orders["Date"] >= pd.to_datetime(start_date)).to_numpy()
+    if end_date is not None:
+        mask &= (orders["Date"] <= pd.to_datetime(end_date)).to_numpy()
+    if products is not None and len(products):
+        mask &= _is_in(orders["Product"], products)
+    if customers is not None and len(customers):
+        mask &= _is_in(orders["CustomerName"], customers)
+    if errors_only and "error_flags" in orders.columns:
+        mask &= _has_error(orders["error_flags"])
+
+    rows = np.flatnonzero(mask)
+    if sort_by is None:
+        positions = rows[offset:offset + limit]
+    else:
+        key = _sort_key(orders[sort_by])[rows]
+        positions = rows[_rank_positions(key, limit, offset, ascending)]
+    return orders.iloc[positions], len(rows)
+
+# One page of products ranked by `by`: (page, number of products in the window)
+@timed("analytics.top_products_page")
+def top_products_page(df, n=10, by="total_quantity", offset=0, time_period=None, start_date=None, end_date=None):
+    table = product_totals(df, time_period, start_date, end_date)
+    return top_n(table, n=n, by=by, offset=offset), len(table)
+
+# One page of customers ranked by `by`: (page, number of customers)
+@timed("analytics.top_customers_page")
+def top_customers_page(df, n=10, by="num_orders", offset=0):
+    table = customer_totals(df)
+    return top_n(table, n=n, by=by, offset=offset), len(table)
 
 if __name__ == "__main__":
     # Test data
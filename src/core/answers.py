@@ -0,0 +1,158 @@
+import time
+import unicodedata
+from bisect import bisect_left
+from datetime import date
+import numpy as np
+from src.utils.config import Config
+from src.core.analytics import product_totals, customer_totals, sales_trend
+from src.utils.instrumentation import span
+
+# Precomputed answers for the bot's inline queries ("product Webcam", "customer Paweł",
+# "sales 7d"), built once per dataset so a query is only a lookup: a binary search over
+# the sorted names and a few array operations, without touching the sheet or the orders.
+
+
+# Lower case without accents, so "pawel" finds "Paweł" only as far as Unicode decomposes
+# (é -> e, but ł stays ł)
+def fold(text):
+    text = unicodedata.normalize("NFKD", str(text))
+    return "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+
+def _money(value):
+    return f"{value:,.0f}"
+
+def _last(days):
+    return "last day" if days == 1 else f"last {days} days"
+
+
+# Prefix search over names: every name is indexed from the start of each of its words,
+# so "kow" and "paweł k" both find "Paweł Kowalski". Matches come back by rank (0 first).
+class NameIndex:
+    def __init__(self, names, ranks):
+        keys = []
+        for i, name in enumerate(names):
+            words = fold(name).split()
+            keys.extend((" ".join(words[start:]), i) for start in range(len(words)))
+        keys.sort()
+        self.keys = [key for key, _ in keys]
+        self.ids = np.array([i for _, i in keys], dtype=np.int64)
+        self.ranks = np.asarray(ranks)
+        self.by_rank = np.argsort(self.ranks, kind="stable")
+
+    # Positions (in names) of up to limit names with a word starting with prefix, best ranked first
+    def search(self, prefix, limit):
+        prefix = " ".join(fold(prefix).split())
+        if not prefix:
+            return self.by_rank[:limit]
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + "\U0010ffff", lo)
+        # A name matches once per matching word; marking ids dedupes in linear time
+        matched = np.zeros(len(self.ranks), dtype=bool)
+        matched[self.ids[lo:hi]] = True
+        found = np.flatnonzero(matched)
+        if len(found) > limit:
+            found = found[np.argpartition(self.ranks[found], limit)[:limit]]
+        return found[np.argsort(self.ranks[found], kind="stable")]
+
+
+# Answers are dicts with an id (unique within the index), title, description and the message text
+class AnswerIndex:
+    def __init__(self, orders, version=None, max_days=None):
+        self.version = version
+        self.max_days = max_days or Config.INLINE_MAX_DAYS
+        self.built_on = date.today()
+        # When the data behind the index was last checked for changes (see is_stale)
+        self.checked_at = time.monotonic()
+        with span("answers.build"):
+            self._build_products(orders)
+            self._build_customers(orders)
+            self._build_sales(orders)
+
+    def _build_products(self, orders):
+        totals = product_totals(orders)
+        try:
+            recent = product_totals(orders, time_period=30).reindex(totals.index, fill_value=0)
+        except ValueError:
+            recent = totals * 0
+        self.products = []
+        rows = zip(totals.index, totals["total_quantity"].tolist(), totals["num_orders"].tolist(),
+                   totals["total_revenue"].tolist(), recent["total_quantity"].tolist(), recent["total_revenue"].tolist())
+        for i, (name, quantity, orders_count, revenue, recent_quantity, recent_revenue) in enumerate(rows):
+            self.products.append({
+                "id": f"p{i}",
+                "title": str(name),
+                "description": f"{quantity} sold, revenue {_money(revenue)}",
+                "text": (f"{name}\nSold: {quantity} in {orders_count} orders, revenue {_money(revenue)}\n"
+                         f"Last 30 days: {recent_quantity} sold, revenue {_money(recent_revenue)}"),
+            })
+        ranks = totals["total_revenue"].rank(ascending=False, method="first").to_numpy()
+        self.product_names = NameIndex(totals.index, ranks)
+
+    def _build_customers(self, orders):
+        totals = customer_totals(orders)
+        self.customers = []
+        rows = zip(totals.index, totals["num_orders"].tolist(), totals["orders_cost"].tolist(),
+                   totals["days_since_last_order"].tolist())
+        for i, (name, orders_count, spent, days_since) in enumerate(rows):
+            self.customers.append({
+                "id": f"c{i}",
+                "title": str(name),
+                "description": f"{orders_count} orders, spent {_money(spent)}",
+                "text": f"{name}\nOrders: {orders_count}, spent {_money(spent)}\nLast order {days_since} days ago",
+            })
+        ranks = totals["orders_cost"].rank(ascending=False, method="first").to_numpy()
+        self.customer_names = NameIndex(totals.index, ranks)
+
+    # Every "last N days" total up to max_days, from one pass over the daily totals
+    def _build_sales(self, orders):
+        try:
+            trend, windows = sales_trend(orders, windows=range(1, self.max_days + 1), rolling=())
+        except ValueError:
+            windows = None
+        self.sales_windows = {} if windows is None else windows.to_dict(orient="index")
+
+    def sales_answer(self, days):
+        window = self.sales_windows.get(days)
+        if window is None or not window["total"]:
+            return {"id": f"s{days}", "title": f"Sales, {_last(days)}", "description": "No sales",
+                    "text": f"No sales in the {_last(days)}"}
+        text = f"Sales, {_last(days)}: {_money(window['total'])} (daily average {_money(window['daily_avg'])})"
+        change = window["change_pct"]
+        if change == change:  # not NaN
+            text += f"\n{change:+.1f}% vs the {'day' if days == 1 else f'{days} days'} before"
+        return {"id": f"s{days}", "title": f"Sales, {_last(days)}", "description": _money(window["total"]), "text": text}
+
+    def sales(self, query):
+        query = query.strip().lower().removesuffix("d").strip()
+        if not query:
+            return [self.sales_answer(days) for days in Config.INLINE_WINDOWS]
+        if not query.isdigit() or not 1 <= int(query) <= self.max_days:
+            return []
+        return [self.sales_answer(int(query))]
+
+    def find_products(self, prefix, limit):
+        return [self.products[i] for i in self.product_names.search(prefix, limit)]
+
+    def find_customers(self, prefix, limit):
+        return [self.customers[i] for i in self.customer_names.search(prefix, limit)]
+
+    # Answers to an inline query: "product <name>", "customer <name>", "sales [N[d]]";
+    # an empty query lists the default sales windows and anything else searches both names
+    def answer(self, query, limit=None):
+        limit = limit or Config.INLINE_RESULTS
+        kind, _, rest = query.strip().partition(" ")
+        kind = kind.lower()
+        if kind == "product":
+            return self.find_products(rest, limit)
+        if kind == "customer":
+            return self.find_customers(rest, limit)
+        if kind == "sales":
+            return self.sales(rest)
+        if not kind:
+            return self.sales("")
+        products = self.find_products(query, limit)
+        return products + self.find_customers(query, limit - len(products))
+
+    # True once the data has a new version or the day has changed (windows are relative to today)
+    def is_stale(self, version=None):
+        return (version is not None and version != self.version) or date.today() != self.built_on
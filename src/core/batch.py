@@ -0,0 +1,242 @@
+import json
+import os
+import re
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from src.utils.config import Config
+from src.core.data_loader import load_data, load_data_chunked, validate_with_snapshot
+from src.core.data_processor import prepare_orders
+from src.core.analytics import DASHBOARD_VIEWS, get_rollup, register_rollup
+from src.core.memo import result_cache
+from src.utils.instrumentation import span
+
+# Headless reports from a JSON job spec, e.g.
+#   {
+#     "output_dir": "reports",
+#     "formats": ["csv"],
+#     "windows": [{"time_period": 7}, {"time_period": 30}],
+#     "jobs": [
+#       {"name": "sales", "view": "sales"},
+#       {"name": "top_products", "view": "products", "top": 20, "formats": ["csv", "png"],
+#        "windows": [{"start_date": "2025-08-01", "end_date": "2025-08-31"}]},
+#       {"name": "trend", "view": "trend", "params": {"windows": [7, 30, 90]}, "formats": ["json", "png"]},
+#       {"name": "customers", "view": "customers", "top": 50}
+#     ]
+#   }
+# view is one of analytics.DASHBOARD_VIEWS and params are passed to it. Views over a time
+# window (sales, products) run once per entry of their "windows" (default: the spec's),
+# named <name>_<window>, e.g. sales_7d. formats and windows set at the top are defaults.
+
+FORMATS = ("csv", "json", "png")
+WINDOWED_VIEWS = {"sales", "products"}
+
+
+# "7d" for {"time_period": 7}, "2025-08-01_2025-08-31" for a date range
+def window_label(window):
+    if window.get("time_period") is not None:
+        return f"{window['time_period']}d"
+    return f"{window.get('start_date') or 'start'}_{window.get('end_date') or 'end'}"
+
+def _file_name(name):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "-", name)
+
+# Flat list of jobs {name, view, params, formats, top} from a spec dict
+def expand_jobs(spec):
+    default_formats = spec.get("formats", ["csv"])
+    default_windows = spec.get("windows", [])
+    jobs = []
+    for entry in spec.get("jobs", []):
+        view = entry.get("view")
+        if view not in DASHBOARD_VIEWS:
+            raise ValueError(f"Unknown view: {view}. Choose from: {list(DASHBOARD_VIEWS)}")
+        name = entry.get("name", view)
+        formats = entry.get("formats", default_formats)
+        unknown = [fmt for fmt in formats if fmt not in FORMATS]
+        if unknown:
+            raise ValueError(f"Unknown formats in job {name}: {unknown}. Choose from: {list(FORMATS)}")
+        params = entry.get("params", {})
+        if view in WINDOWED_VIEWS:
+            windows = entry.get("windows", default_windows) or [None]
+        elif "windows" in entry:
+            raise ValueError(f"Job {name}: view {view} doesn't take time windows.")
+        else:
+            windows = [None]
+        for window in windows:
+            jobs.append({
+                "name": _file_name(f"{name}_{window_label(window)}" if window else name),
+                "view": view,
+                "params": {**params, **(window or {})},
+                "formats": list(formats),
+                "top": entry.get("top"),
+            })
+    if not jobs:
+        raise ValueError("The job spec has no jobs.")
+    duplicates = sorted(name for name, n in Counter(job["name"] for job in jobs).items() if n > 1)
+    if duplicates:
+        raise ValueError(f"Job names must be unique: {duplicates}")
+    return jobs
+
+def load_spec(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+# Results as named tables plus scalar values: the main table is under ""
+def result_tables(view, result, top=None):
+    values = {}
+    if view == "daily":
+        tables = {"": result.to_frame()}
+    elif view == "sales":
+        sales_daily, total = result
+        tables = {"": sales_daily}
+        values["total"] = float(total)
+    elif view == "trend":
+        trend, windows = result
+        tables = {"": trend, "windows": windows}
+    else:
+        tables = {"": result.head(top) if top else result}
+    return tables, values
+
+# Tables indexed by position (sales, trend) are written without their index
+def _keeps_index(table):
+    return not isinstance(table.index, pd.RangeIndex)
+
+def _records(table):
+    table = table.reset_index() if _keeps_index(table) else table
+    return json.loads(table.to_json(orient="records", date_format="iso"))
+
+def result_figure(job, tables):
+    import plotly.express as px
+    table = tables[""]
+    title = job["name"]
+    if job["view"] == "daily":
+        return px.line(table, x=table.index, y="Total cost", title=title)
+    if job["view"] in ("sales", "trend"):
+        return px.line(table, x="Date", y=[col for col in table.columns if col != "Date"], title=title)
+    by = "total_quantity" if job["view"] == "products" else "num_orders"
+    return px.bar(table, x=table.index, y=by, title=title)
+
+# Writes the job's artifacts to output_dir; returns their file names
+def write_artifacts(job, tables, values, output_dir):
+    written = []
+    base = os.path.join(output_dir, job["name"])
+    if "csv" in job["formats"]:
+        for suffix, table in tables.items():
+            path = f"{base}_{suffix}.csv" if suffix else f"{base}.csv"
+            table.to_csv(path, index=_keeps_index(table))
+            written.append(os.path.basename(path))
+    if "json" in job["formats"]:
+        document = {"name": job["name"], "view": job["view"], "params": job["params"], **values,
+                    "tables": {suffix or job["view"]: _records(table) for suffix, table in tables.items()}}
+        with open(f"{base}.json", "w") as f:
+            json.dump(document, f, indent=2, default=str)
+        written.append(f"{job['name']}.json")
+    if "png" in job["formats"]:
+        from src.core.charts import render_png
+        with open(f"{base}.png", "wb") as f:
+            f.write(render_png(result_figure(job, tables)))
+        written.append(f"{job['name']}.png")
+    return written
+
+
+# Orders shared by the jobs of one worker process, set once by _init_worker
+_orders = None
+
+# Each job runs once, so workers skip the analytics cache and the fingerprint of the
+# frame its keys would need
+def _init_worker(orders, rollup):
+    global _orders
+    _orders = orders
+    if rollup is not None:
+        register_rollup(orders, rollup)
+    result_cache.max_entries = 0
+
+# One job over orders (in a worker: the shared ones), computing the view and writing its artifacts.
+# Failures are reported in the returned timing row rather than raised, so the other jobs still run.
+def run_job(job, output_dir, orders=None):
+    orders = _orders if orders is None else orders
+    row = {"name": job["name"], "view": job["view"], "status": "ok", "rows": 0,
+           "compute_s": 0.0, "write_s": 0.0, "artifacts": [], "error": ""}
+    started = time.perf_counter()
+    try:
+        result = DASHBOARD_VIEWS[job["view"]](orders, **job["params"])
+        tables, values = result_tables(job["view"], result, job["top"])
+        computed = time.perf_counter()
+        row["compute_s"] = round(computed - started, 4)
+        row["rows"] = len(tables[""])
+        row["artifacts"] = write_artifacts(job, tables, values, output_dir)
+        row["write_s"] = round(time.perf_counter() - computed, 4)
+    except Exception as e:
+        row["status"] = "failed"
+        row["error"] = f"{e.__class__.__name__}: {e}"
+    row["total_s"] = round(time.perf_counter() - started, 4)
+    return row
+
+# Runs the jobs over one prepared copy of the orders in a process pool (workers=1: in
+# this process). Every worker gets the orders and their date rollup once, when it starts.
+def run_jobs(jobs, clean_df, output_dir, workers=None):
+    workers = min(workers or Config.BATCH_WORKERS or os.cpu_count(), len(jobs))
+    os.makedirs(output_dir, exist_ok=True)
+    with span("batch.prepare"):
+        orders = prepare_orders(clean_df)
+        rollup = get_rollup(orders)
+
+    with span("batch.jobs"):
+        if workers == 1:
+            return [run_job(job, output_dir, orders) for job in jobs]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(orders, rollup)) as pool:
+            futures = {pool.submit(run_job, job, output_dir): i for i, job in enumerate(jobs)}
+            rows = [None] * len(jobs)
+            for future in as_completed(futures):
+                rows[futures[future]] = future.result()
+            return rows
+
+# Loads and validates once, runs every job of the spec and writes summary.json (and
+# summary.csv) next to the artifacts. Returns the summary dict.
+def run_batch(spec, output_dir=None, workers=None, source=None):
+    started_at = pd.Timestamp.now().isoformat(timespec="seconds")
+    started = time.perf_counter()
+    jobs = expand_jobs(spec)
+    output_dir = output_dir or spec.get("output_dir") or Config.BATCH_OUTPUT_DIR
+    workers = workers or spec.get("workers")
+
+    if Config.LOAD_MODE == "chunked":
+        # Chunks are validated as they arrive, so load_s includes validation
+        with span("batch.load"):
+            _, clean_df, errors, sheet = load_data_chunked(source, raw=False)
+        loaded = validated = time.perf_counter()
+    else:
+        with span("batch.load"):
+            df, sheet = load_data(source)
+        loaded = time.perf_counter()
+        with span("batch.validate"):
+            clean_df, errors = validate_with_snapshot(df)
+        validated = time.perf_counter()
+
+    rows = run_jobs(jobs, clean_df, output_dir, workers)
+    finished = time.perf_counter()
+
+    summary = {
+        "started_at": started_at,
+        "output_dir": output_dir,
+        "rows": len(clean_df),
+        "validation_errors": len(errors),
+        "load_s": round(loaded - started, 4),
+        "validate_s": round(validated - loaded, 4),
+        "jobs_s": round(finished - validated, 4),
+        "total_s": round(finished - started, 4),
+        "failed": [row["name"] for row in rows if row["status"] != "ok"],
+        "jobs": rows,
+    }
+    with open(os.path.join(output_dir, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    summary_table(summary).to_csv(os.path.join(output_dir, "summary.csv"))
+    return summary
+
+# Per-job timings as a table, slowest first
+def summary_table(summary):
+    table = pd.DataFrame(summary["jobs"]).set_index("name")
+    table["artifacts"] = table["artifacts"].str.join(" ")
+    return table.sort_values(by="total_s", ascending=False)
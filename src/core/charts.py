@@ -0,0 +1,99 @@
+import io
+import logging
+import threading
+import time
+from collections import OrderedDict
+from src.utils.config import Config
+from src.utils.instrumentation import span, count
+
+logger = logging.getLogger(__name__)
+
+
+# Size-bounded LRU of rendered PNG bytes
+class ChartCache:
+    def __init__(self, max_size=None):
+        self.max_size = Config.CHART_CACHE_SIZE if max_size is None else max_size
+        self.hits = 0
+        self.misses = 0
+        self._charts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            png = self._charts.get(key)
+            if png is None:
+                self.misses += 1
+                return None
+            self._charts.move_to_end(key)
+            self.hits += 1
+            return png
+
+    def put(self, key, png):
+        with self._lock:
+            self._charts[key] = png
+            self._charts.move_to_end(key)
+            while len(self._charts) > self.max_size:
+                self._charts.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._charts.clear()
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / requests, 3) if requests else 0.0,
+                "entries": len(self._charts),
+                "bytes": sum(len(png) for png in self._charts.values()),
+            }
+
+
+chart_cache = ChartCache()
+# One renderer (Kaleido's browser) is shared, so renders go one at a time
+_render_lock = threading.Lock()
+_renderer_warm = False
+
+
+# Starts Kaleido's persistent renderer when available and renders a throwaway chart,
+# so the first real request doesn't pay the cold start
+def warm_up_renderer():
+    global _renderer_warm
+    with _render_lock:
+        if _renderer_warm:
+            return
+        started = time.perf_counter()
+        try:
+            import kaleido
+            start_server = getattr(kaleido, "start_sync_server", None)
+            if start_server is not None:
+                start_server()
+        except Exception as e:
+            logger.warning(f"Kaleido persistent renderer not started: {e}")
+        import plotly.express as px
+        px.line(x=[0, 1], y=[0, 1]).to_image(format="png")
+        _renderer_warm = True
+    logger.info(f"Chart renderer warmed up in {time.perf_counter() - started:.2f}s")
+
+def render_png(fig):
+    started = time.perf_counter()
+    img_bytes = io.BytesIO()
+    with _render_lock, span("chart.render"):
+        fig.write_image(img_bytes, format="png")
+    logger.info(f"Chart rendered in {time.perf_counter() - started:.3f}s")
+    return img_bytes.getvalue()
+
+# PNG for key from the cache, or build_figure() rendered and cached.
+# key should identify the chart kind, its parameters and the dataset version.
+def cached_png(key, build_figure):
+    png = chart_cache.get(key)
+    hit = png is not None
+    count("chart_cache.hit" if hit else "chart_cache.miss")
+    if not hit:
+        png = render_png(build_figure())
+        chart_cache.put(key, png)
+    stats = chart_cache.stats()
+    logger.info(f"Chart cache {'hit' if hit else 'miss'} for {key[:2]}: hit rate {stats['hit_rate']:.0%}, {stats['entries']} cached")
+    return png
@@ -1,77 +1,360 @@
-import gspread
-from google.oauth2.service_account import Credentials
 import pandas as pd
+import hashlib
+import json
 import os
-import streamlit as st
+import threading
+import time
 from dotenv import load_dotenv
 from src.utils.config import Config
+from src.core.data_processor import validate_data, prepare_orders, clean_frame, memory_report, ValidationSnapshot, append_orders, column_letter
+from src.core.data_sources import get_data_source, rows_to_frame, frame_to_values
+from src.utils.instrumentation import count, span
 
-# Connect with Google Sheets
-scopes = [
-        "https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/drive"
-    ]
-
-def load_data():
+# Loads from the backend selected by Config.DATA_SOURCE (Google Sheets by default)
+def load_data(source=None):
     try:
         load_dotenv()
-        creds = Credentials.from_service_account_file("credentials.json", scopes=scopes)
-        print("Credentials loaded")
-        client = gspread.authorize(creds)
-        print("Client authorized")
-        try:
-            spreadheet_key = Config.SPREADSHEET_KEY
-        except AttributeError:
-            raise ValueError("Spreadsheet key not defined in file: config.py. Please set SPREADSHEET_KEY.")
-
-        if not spreadheet_key:
-            raise ValueError("SPREADSHEET_KEY is empty. Please set it in environment variables or config.py.")
-        sheet = client.open_by_key(spreadheet_key).sheet1
-        print("Spreadsheet opened")
-        data = sheet.get_all_records()
-        print(f"Got {len(data)} records")
-        df = pd.DataFrame(data)
-
-        if df.empty:
-            raise ValueError("No data in spreadsheet.")
-
-        return df, sheet
+        return (source or get_data_source()).load()
     except FileNotFoundError as e:
-        print(f"Credentials file - credentials.json not found: {e}")
+        print(f"File not found (credentials.json or local data file): {e}")
         raise
     except Exception as e:
         print(f"Error while loading data: {e}")
         raise
 
 
+# Streamlit variant: Google Sheets credentials come from st.secrets
+def web_source():
+    return get_data_source("streamlit" if Config.DATA_SOURCE == "sheets" else None)
+
 def load_data_web():
-    try:
-        creds = Credentials.from_service_account_info(
-            st.secrets["gcp_service_account"],
-            scopes=scopes
+    return load_data(web_source())
+
+# Loaders that read one source can also be read chunk by chunk (see load_validated)
+load_data.make_source = get_data_source
+load_data_web.make_source = web_source
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+# validate_data backed by the snapshot at Config.VALIDATION_SNAPSHOT (if set): the file is
+# read once per process, only new or changed rows are checked, and it's rewritten after changes
+def validate_with_snapshot(df, path=None):
+    global _snapshot
+    path = path or Config.VALIDATION_SNAPSHOT
+    if not path:
+        return validate_data(df)
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot.path != path:
+            _snapshot = ValidationSnapshot.load(path)
+        result = validate_data(df, snapshot=_snapshot)
+        _snapshot.save(path)
+    return result
+
+
+# (chunk, clean_chunk, errors) as the chunks arrive, each validated on its own
+def iter_validated_chunks(source=None, chunk_size=None):
+    source = source or get_data_source()
+    for chunk in source.iter_chunks(chunk_size):
+        if chunk.empty:
+            continue
+        yield chunk, *validate_data(chunk)
+
+# Streaming counterpart of load_data + validate_data: (df, clean_df, errors, sheet). The
+# sheet is read in chunk_size row ranges rather than as one response; with raw=False the
+# raw rows aren't kept and df is None.
+def load_data_chunked(source=None, chunk_size=None, raw=True):
+    load_dotenv()
+    source = source or get_data_source()
+    chunks, frames, errors = [], [], []
+    with span("load.chunked"):
+        for chunk, clean_chunk, chunk_errors in iter_validated_chunks(source, chunk_size):
+            if raw:
+                chunks.append(chunk)
+            frames.append(clean_chunk)
+            errors.extend(chunk_errors)
+    if not frames:
+        raise ValueError("No data in spreadsheet.")
+    print(f"Got {sum(len(frame) for frame in frames)} records in {len(frames)} chunks")
+    df = pd.concat(chunks, ignore_index=True) if raw else None
+    return df, pd.concat(frames, ignore_index=True), errors, source.sheet
+
+# load_data + validate_with_snapshot: (df, clean_df, errors, sheet). With Config.LOAD_MODE
+# "chunked" it's load_data_chunked instead, which doesn't use the validation snapshot.
+def load_validated(source=None):
+    if Config.LOAD_MODE == "chunked":
+        return load_data_chunked(source)
+    df, sheet = load_data(source)
+    clean_df, errors = validate_with_snapshot(df)
+    return df, clean_df, errors, sheet
+
+
+# Loader for sheets that only ever get rows appended. It remembers how many rows it has
+# read and a checksum of the last few, and fetch_new() then reads only the rows below
+# them, in one request together with the header. Used like load_data by the dataset cache.
+class SheetSync:
+    def __init__(self, source=None, name="sheet_sync", tail_rows=None, full_every=None):
+        self.source = source
+        self.__name__ = name
+        self.tail_rows = Config.SYNC_TAIL_ROWS if tail_rows is None else tail_rows
+        self.full_every = Config.SYNC_FULL_EVERY if full_every is None else full_every
+        self.sheet = None
+        self.header = None
+        self.rows = 0
+        self.tail_checksum = None
+        self.syncs = 0
+
+    # Full load, read in ranges so the cells come back the same way fetch_new reads them
+    def __call__(self):
+        source = self.source or get_data_source()
+        with span("sync.full"):
+            frames = [chunk for chunk in source.iter_chunks() if not chunk.empty]
+        if not frames:
+            raise ValueError("No data in spreadsheet.")
+        df = pd.concat(frames, ignore_index=True)
+        self.sheet = source.sheet
+        self.header = list(df.columns)
+        self.rows = len(df)
+        self.tail_checksum = tail_checksum(frame_to_values(df.tail(self.tail_rows))[1:])
+        self.syncs = 0
+        count("sync.full")
+        print(f"Synced {self.rows} rows (full)")
+        return df, self.sheet
+
+    # Rows appended since the last sync as a DataFrame (possibly empty), or None when
+    # the sheet was changed some other way and has to be reloaded in full.
+    # Edits above the checked tail can't be seen, so every full_every-th sync is a full one.
+    def fetch_new(self):
+        if self.sheet is None or self.header is None:
+            return None
+        self.syncs += 1
+        if self.full_every and self.syncs >= self.full_every:
+            return None
+
+        known = min(self.tail_rows, self.rows)
+        start = self.rows + 2 - known
+        with span("sync.fetch"):
+            header, rows = self.sheet.batch_get(
+                ["1:1", f"A{start}:{column_letter(len(self.header))}"],
+                value_render_option="UNFORMATTED_VALUE",
+                date_time_render_option="FORMATTED_STRING",
+            )
+        header = list(header[0]) if header else []
+        width = len(self.header)
+        rows = [list(row) + [""] * (width - len(row)) for row in rows]
+
+        if header != self.header or len(rows) < known or tail_checksum(rows[:known]) != self.tail_checksum:
+            print("Sheet was edited, not just appended to; reloading it")
+            count("sync.fallback")
+            return None
+
+        new_rows = rows[known:]
+        if new_rows:
+            self.rows += len(new_rows)
+            self.tail_checksum = tail_checksum(rows[-self.tail_rows:] if self.tail_rows else [])
+        count("sync.rows", len(new_rows))
+        print(f"Synced {len(new_rows)} new rows")
+        return rows_to_frame(self.header, new_rows)
+
+# Checksum of sheet rows, insensitive to how a number happens to be typed (10, 10.0)
+def tail_checksum(rows):
+    def cell(value):
+        if hasattr(value, "item"):
+            value = value.item()
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        return str(value)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([[cell(value) for value in row] for row in rows]).encode())
+    return digest.hexdigest()
+
+
+# A loaded dataset keeps the raw frame (the sheet contents, which writes are diffed
+# against) and the prepared orders. The validated frame is only needed to write back
+# and is rebuilt from those two on demand.
+class CachedDataset:
+    def __init__(self, df, orders, errors, sheet, version):
+        self.df = df
+        self.orders = orders
+        self.errors = errors
+        self.sheet = sheet
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self._memory = None
+
+    # Validated frame as validate_data returns it, rebuilt on every access (a copy the
+    # caller can modify)
+    @property
+    def clean_df(self):
+        return clean_frame(self.df, self.orders["error_flags"])
+
+    # Content hash of the orders, for keying derived caches
+    @property
+    def fingerprint(self):
+        # analytics imports this module, so it can only be imported on use
+        from src.core.analytics import frame_fingerprint
+        return frame_fingerprint(self.orders)
+
+    # memory_report of the raw and the prepared frame, computed once
+    def memory_report(self):
+        if self._memory is None:
+            self._memory = memory_report(self.df, self.orders)
+        return self._memory
+
+    # This dataset with new_rows (raw, as loaded) appended. Only the new rows are validated
+    # and prepared; the rollup and fingerprint already built are extended, not rebuilt.
+    def appended(self, new_rows, version):
+        from src.core.analytics import extend_frame_state
+        clean_rows, errors = validate_data(new_rows)
+        new_orders = prepare_orders(clean_rows)
+        dataset = CachedDataset(
+            pd.concat([self.df, new_rows], ignore_index=True),
+            append_orders(self.orders, new_orders),
+            self.errors + errors,
+            self.sheet,
+            version,
         )
-        client = gspread.authorize(creds)
+        extend_frame_state(self.orders, dataset.orders, new_orders)
+        return dataset
+
+
+# Process-wide cache of validated datasets, one entry per loader.
+# Concurrent callers that miss share a single in-flight fetch.
+class DatasetCache:
+    def __init__(self, ttl=None):
+        self.ttl = Config.DATA_CACHE_TTL if ttl is None else ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._inflight = {}
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def get(self, loader, ttl=None, force=False):
+        ttl = self.ttl if ttl is None else ttl
+        key = loader.__name__
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not force and time.monotonic() - entry.loaded_at < ttl:
+                self.hits += 1
+                count("dataset_cache.hit")
+                return entry
+            flight = self._inflight.get(key)
+            owner = flight is None
+            if owner:
+                flight = self._inflight[key] = {"done": threading.Event(), "error": None, "entry": None}
+                self.misses += 1
+                count("dataset_cache.miss")
+            else:
+                self.hits += 1
+                count("dataset_cache.shared")
+
+        if not owner:
+            # Someone else is already fetching; wait and reuse their result
+            flight["done"].wait()
+            if flight["error"] is not None:
+                raise flight["error"]
+            return flight["entry"]
+
         try:
-            spreadsheet_key = st.secrets["gcp_service_account"]["SPREADSHEET_KEY"]
-        except AttributeError:
-            raise ValueError("Spreadsheet key not defined. Please set SPREADSHEET_KEY.")
+            new_rows = None
+            if entry is not None and not force and hasattr(loader, "fetch_new"):
+                new_rows = loader.fetch_new()
 
-        if not spreadsheet_key:
-            raise ValueError("SPREADSHEET_KEY is empty.")
-        sheet = client.open_by_key(spreadsheet_key).sheet1
+            if new_rows is not None and new_rows.empty:
+                # Nothing appended: keep the dataset (and everything derived from it)
+                entry.loaded_at = time.monotonic()
+            elif new_rows is not None:
+                with self._lock:
+                    self._version += 1
+                    version = self._version
+                entry = entry.appended(new_rows, version)
+            else:
+                if hasattr(loader, "make_source"):
+                    # load_data and load_data_web, read as Config.LOAD_MODE says
+                    df, clean_df, errors, sheet = load_validated(loader.make_source())
+                else:
+                    df, sheet = loader()
+                    clean_df, errors = validate_with_snapshot(df)
+                # Only the raw and the prepared frame are kept (see CachedDataset)
+                orders = prepare_orders(clean_df)
+                del clean_df
+                with self._lock:
+                    self._version += 1
+                    entry = CachedDataset(df, orders, errors, sheet, self._version)
+            with self._lock:
+                self._entries[key] = entry
+            flight["entry"] = entry
+            return entry
+        except Exception as e:
+            flight["error"] = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight["done"].set()
 
-        print("Spreadsheet opened")
-        data = sheet.get_all_records()
-        print(f"Got {len(data)} records")
-        df = pd.DataFrame(data)
+    # Cached dataset for loader, however old, or None; never loads
+    def peek(self, loader):
+        with self._lock:
+            return self._entries.get(loader.__name__)
 
-        if df.empty:
-            raise ValueError("No data in spreadsheet.")
+    def invalidate(self, loader=None):
+        with self._lock:
+            if loader is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(loader.__name__, None)
 
-        return df, sheet
-    except FileNotFoundError as e:
-        print(f"Credentials file - credentials.json not found: {e}")
-        raise
-    except Exception as e:
-        print(f"Error while loading data: {e}")
-        raise
\ No newline at end of file
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "ttl": self.ttl,
+            }
+
+
+dataset_cache = DatasetCache()
+
+sheet_sync = SheetSync()
+
+# load_data, or the append-only sheet_sync when Config.SYNC_MODE is "append"
+def default_loader():
+    return sheet_sync if Config.SYNC_MODE == "append" else load_data
+
+# Validated dataset from the shared cache; reloads (or syncs) once the TTL has passed
+def get_dataset(loader=None, ttl=None, force=False):
+    return dataset_cache.get(loader or default_loader(), ttl=ttl, force=force)
+
+# Dataset already in the cache, without loading or syncing (None before the first load)
+def peek_dataset(loader=None):
+    return dataset_cache.peek(loader or default_loader())
+
+# One line on the memory held by the cached dataset, for /stats and the web app's
+# Performance panel
+def dataset_memory_summary(loader=None):
+    dataset = peek_dataset(loader)
+    if dataset is None:
+        return "Dataset memory: nothing loaded yet"
+    report = dataset.memory_report()
+    mib = 1024 * 1024
+    return (f"Dataset memory: {report['raw_bytes'] / mib:.1f} MiB sheet contents, "
+            f"{report['prepared_bytes'] / mib:.1f} MiB prepared orders ({report['ratio']}x smaller)")
+
+def load_validated_data(loader=None, ttl=None, force=False):
+    dataset = get_dataset(loader, ttl=ttl, force=force)
+    return dataset.clean_df, dataset.errors, dataset.sheet
+
+# Prepared order frame (see prepare_orders) for the analytics functions
+def load_orders(loader=None, ttl=None, force=False):
+    return get_dataset(loader, ttl=ttl, force=force).orders
+
+# Drop cached data, e.g. after writing back to the sheet
+def invalidate_data_cache(loader=None):
+    dataset_cache.invalidate(loader)
+
+def data_cache_stats():
+    return dataset_cache.stats()
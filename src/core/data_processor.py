@@ -2,6 +2,9 @@ import pandas as pd
 from datetime import date, datetime, timedelta
 import numpy as np
 import json
+import hashlib
+import os
+from src.utils.instrumentation import span, timed, count
 
 RULES = {
     "OrderID": {
@@ -36,7 +39,10 @@ def datetime_to_string(df):
     df["Date"] = df["Date"].dt.strftime("%Y-%m-%d")
 
 
-def validate_data(df):
+# With a ValidationSnapshot, error_flags of rows already validated in an earlier run are
+# reused and only new or changed rows are checked; the snapshot is then updated in place.
+@timed("validate")
+def validate_data(df, snapshot=None):
     try:
         if df is None:
             raise ValueError("There is no DataFrame to validate")
@@ -50,46 +56,152 @@ def validate_data(df):
         if missing_columns:
             raise ValueError(f"Missing columns: {missing_columns}")
 
-        df_copy = df.copy()
-        string_to_datetime(df_copy)
+        df_copy = coerce_columns(df)
 
-        for column, rules in RULES.items():
+        if snapshot is None:
+            all_errors = build_error_flags(df_copy)
+        else:
+            all_errors = snapshot.error_flags(df_copy)
 
-            if rules["type"] in [int, float]:
-                df_copy[column] = pd.to_numeric(df_copy[column], errors="coerce")
+        errors_only = [err for err in all_errors if err]
 
-        all_errors = []
+        return add_error_flags(df_copy, all_errors), errors_only
+    except Exception as e:
+        raise ValueError(f"Error: {e}")
 
-        for i, row in df_copy.iterrows():
-            errors = []
-            for column, rules in RULES.items():
-            # print(f"{i+1} iteracja:")
-            # print(row[column])
-            # print(rules["required"])
+# Copy of the raw frame with dates parsed and numeric columns coerced (NaN where invalid)
+def coerce_columns(df):
+    df_copy = df.copy()
+    string_to_datetime(df_copy)
 
-                if rules["required"] and pd.isnull(row[column]):
-                    errors.append(f"{column}: Error cell empty")
+    for column, rules in RULES.items():
 
-                if rules["type"] in [int, float]:
-                    if not pd.api.types.is_numeric_dtype(df_copy[column]):
-                        errors.append(f"{column}: Error data type")
+        if rules["type"] in [int, float]:
+            df_copy[column] = pd.to_numeric(df_copy[column], errors="coerce")
+    return df_copy
 
-                if "min" in rules and not pd.isnull(row[column]) and row[column] < rules["min"]:
-                    errors.append(f"{column}: Value error")
+# Adds the error_flags column and blanks missing text cells, in place; returns df
+def add_error_flags(df, error_flags):
+    df["error_flags"] = error_flags
 
-        # print(f"Row {i} errors: {errors}")
-            all_errors.append("; ".join(errors))
-        df_copy["error_flags"] = all_errors
+    for col in df.columns:
+        if df[col].dtype == 'object':
+            df[col] = df[col].fillna("")
+    return df
 
-        errors_only = [err for err in all_errors if err]
+# The validated frame (as validate_data returns it) rebuilt from the raw frame and the
+# error_flags already found for it, without running the checks again
+def clean_frame(raw, error_flags):
+    return add_error_flags(coerce_columns(raw), list(error_flags))
 
-        for col in df_copy.columns:
-            if df_copy[col].dtype == 'object':
-                df_copy[col] = df_copy[col].fillna("")
+# One boolean mask per rule check, in the same order the messages appear in error_flags
+def rule_masks(df):
+    masks = []
+    for column, rules in RULES.items():
+        values = df[column]
+        is_null = values.isna().to_numpy()
 
-        return df_copy, errors_only
-    except Exception as e:
-        raise ValueError(f"Error: {e}")
+        if rules["required"]:
+            masks.append((f"{column}: Error cell empty", is_null))
+
+        if rules["type"] in [int, float]:
+            # Dtype check is per column, so it flags either every row or none
+            type_error = not pd.api.types.is_numeric_dtype(values)
+            masks.append((f"{column}: Error data type", np.full(len(df), type_error)))
+
+        if "min" in rules:
+            below_min = np.zeros(len(df), dtype=bool)
+            not_null = ~is_null
+            below_min[not_null] = (values[not_null] < rules["min"]).to_numpy(dtype=bool)
+            masks.append((f"{column}: Value error", below_min))
+    return masks
+
+# Turns the rule masks into one "; "-joined message per row
+def build_error_flags(df):
+    masks = rule_masks(df)
+    if not masks:
+        return [""] * len(df)
+
+    # Encode every row's combination of failed checks as a bit pattern, then join
+    # messages once per distinct pattern instead of once per row
+    codes = np.zeros(len(df), dtype=np.int64)
+    for bit, (_, mask) in enumerate(masks):
+        codes |= mask.astype(np.int64) << bit
+
+    patterns, inverse = np.unique(codes, return_inverse=True)
+    messages = np.empty(len(patterns), dtype=object)
+    for i, pattern in enumerate(patterns):
+        messages[i] = "; ".join(msg for bit, (msg, _) in enumerate(masks) if pattern >> bit & 1)
+    return messages[inverse.ravel()].tolist()
+
+# Per-row content hash of the columns the rules look at, taken after dates and numbers
+# are parsed, so it changes exactly when a row's error_flags can change
+def row_hashes(df):
+    return pd.util.hash_pandas_object(df[list(RULES)], index=False).to_numpy()
+
+# error_flags of the last validated dataset keyed by row hash, optionally kept on disk as
+# Parquet (row_hash, error_flags) so a cold start doesn't re-check every row
+class ValidationSnapshot:
+    def __init__(self, hashes=None, flags=None, path=None):
+        self.hashes = np.empty(0, dtype=np.uint64) if hashes is None else hashes
+        self.flags = np.empty(0, dtype=object) if flags is None else flags
+        self.path = path
+        self.dirty = False
+        self.writable = True
+
+    @classmethod
+    def load(cls, path):
+        try:
+            table = pd.read_parquet(path)
+        except FileNotFoundError:
+            return cls(path=path)
+        except Exception as e:
+            print(f"Validation snapshot {path} not loaded: {e}")
+            return cls(path=path)
+        print(f"Loaded validation snapshot of {len(table)} rows")
+        return cls(table["row_hash"].to_numpy(dtype=np.uint64), table["error_flags"].to_numpy(dtype=object), path)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    # error_flags for every row of a parsed frame: cached where the hash is known, checked otherwise
+    def error_flags(self, df):
+        with span("validate.hash"):
+            hashes = row_hashes(df)
+        # Identical rows have identical flags, so the first of any duplicates will do
+        unique = ~pd.Index(self.hashes).duplicated()
+        positions = pd.Index(self.hashes[unique]).get_indexer(hashes)
+        cached = positions >= 0
+
+        flags = np.empty(len(df), dtype=object)
+        flags[cached] = self.flags[unique][positions[cached]]
+        new = ~cached
+        if new.any():
+            flags[new] = build_error_flags(df[new])
+        count("validate.rows_reused", int(cached.sum()))
+        count("validate.rows_checked", int(new.sum()))
+
+        if new.any() or len(hashes) != len(self.hashes) or not np.array_equal(hashes, self.hashes):
+            self.hashes, self.flags, self.dirty = hashes, flags, True
+        return flags.tolist()
+
+    # Writes the snapshot if it changed; needs pyarrow or fastparquet, otherwise it stays in memory
+    def save(self, path=None):
+        path = path or self.path
+        if not path or not self.dirty or not self.writable:
+            return False
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with span("validate.snapshot_write"):
+                pd.DataFrame({"row_hash": self.hashes, "error_flags": self.flags}).to_parquet(path, index=False)
+        except ImportError as e:
+            print(f"Validation snapshot kept in memory only: {e}")
+            self.writable = False
+            return False
+        self.dirty = False
+        return True
 
 def update_total_cost_column(df):
     if not isinstance(df, pd.DataFrame):
@@ -105,7 +217,85 @@ def update_total_cost_column(df):
     if pd.api.types.is_datetime64_any_dtype(df["Date"]):
         datetime_to_string(df)
 
-def save_to_sheets(df, sheet):
+# Compact, typed copy of the order table for analytics: parsed dates, categorical names,
+# downcast integer ids/quantities and a precomputed Total cost. Analytics functions use
+# a prepared frame as-is instead of copying it and re-parsing dates on every call.
+@timed("prepare_orders")
+def prepare_orders(df):
+    if is_prepared(df):
+        return df
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError(f"Pandas DataFrame expected, got {type(df)}")
+
+    orders = df.copy()
+    orders["Date"] = pd.to_datetime(orders["Date"], errors="coerce")
+    orders["Quantity"] = pd.to_numeric(orders["Quantity"], errors="coerce")
+    orders["Price"] = pd.to_numeric(orders["Price"], errors="coerce")
+    # Computed before downcasting so small integer types can't overflow
+    orders["Total cost"] = orders["Quantity"] * orders["Price"]
+
+    for col in ["Quantity", "OrderID"]:
+        orders[col] = pd.to_numeric(orders[col], errors="coerce", downcast="integer")
+    # error_flags has only a handful of distinct messages
+    for col in ["Product", "CustomerName", "error_flags"]:
+        if col in orders.columns:
+            orders[col] = orders[col].astype("category")
+
+    orders.attrs["prepared"] = True
+    return orders
+
+# Prepared frame with the prepared rows of new_orders appended. Categories are merged
+# so the name columns stay categorical instead of falling back to object.
+def append_orders(orders, new_orders):
+    new_orders = prepare_orders(new_orders)
+    orders, new_orders = orders.copy(), new_orders.copy()
+    for col in orders.columns:
+        if isinstance(orders[col].dtype, pd.CategoricalDtype) and col in new_orders.columns:
+            categories = orders[col].cat.categories.union(new_orders[col].astype("category").cat.categories)
+            orders[col] = orders[col].cat.set_categories(categories)
+            new_orders[col] = new_orders[col].astype(pd.CategoricalDtype(categories))
+    combined = pd.concat([orders, new_orders], ignore_index=True)
+    combined.attrs["prepared"] = True
+    return combined
+
+def is_prepared(df):
+    return (isinstance(df, pd.DataFrame) and df.attrs.get("prepared", False)
+            and pd.api.types.is_datetime64_any_dtype(df["Date"]))
+
+# Content hash of a frame (values and column names, not the index); equal data gives an equal fingerprint
+def dataset_fingerprint(df):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update("\x1f".join(map(str, df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+# Fingerprint of a frame extended by new_rows, from the fingerprint of the frame before.
+# Content-based like dataset_fingerprint, though the two don't give the same value.
+def chain_fingerprint(fingerprint, new_rows):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(fingerprint.encode())
+    digest.update(dataset_fingerprint(new_rows).encode())
+    return digest.hexdigest()
+
+# Deep memory usage per column of the raw and the prepared frame, in bytes
+def memory_report(raw, prepared):
+    raw_usage = raw.memory_usage(deep=True, index=False)
+    prepared_usage = prepared.memory_usage(deep=True, index=False)
+    columns = {
+        col: {"raw": int(raw_usage.get(col, 0)), "prepared": int(prepared_usage.get(col, 0))}
+        for col in prepared.columns
+    }
+    raw_total, prepared_total = int(raw_usage.sum()), int(prepared_usage.sum())
+    return {
+        "raw_bytes": raw_total,
+        "prepared_bytes": prepared_total,
+        "ratio": round(raw_total / prepared_total, 2) if prepared_total else None,
+        "columns": columns,
+    }
+
+# Writes df to the sheet. With previous (the last known sheet contents as a DataFrame)
+# only changed cells are sent, as one batch of per-column range updates.
+def save_to_sheets(df, sheet, previous=None):
 
     # print("Typy kolumn:")
     # print(df.dtypes)
@@ -118,11 +308,33 @@ def save_to_sheets(df, sheet):
     try:
         if pd.api.types.is_datetime64_any_dtype(df["Date"]):
             datetime_to_string(df)
+
+        updates = changed_ranges(df, previous) if previous is not None else None
         df = df.replace([np.nan, pd.NaT], None)
 
-        test_data = [df.columns.values.tolist()] + df.values.tolist()
-        json.dumps(test_data)  # Jeśli przejdzie, to OK
-        sheet.update(test_data)
+        if updates is None:
+            test_data = [df.columns.values.tolist()] + df.values.tolist()
+            payload = json.dumps(test_data)  # Jeśli przejdzie, to OK
+            with span("sheets.write"):
+                sheet.update(test_data)
+            report = {"mode": "full", "ranges": 1, "cells": len(test_data) * len(df.columns), "bytes": len(payload.encode())}
+        else:
+            data = []
+            for cell_range, col, start, stop in updates:
+                values = [[value] for value in df[col].iloc[max(start, 0):stop].tolist()]
+                if start < 0:
+                    values.insert(0, [str(col)])
+                data.append({"range": cell_range, "values": values})
+            payload = json.dumps(data)
+            if data:
+                with span("sheets.write"):
+                    sheet.batch_update(data)
+            report = {"mode": "diff", "ranges": len(data), "cells": sum(len(item["values"]) for item in data), "bytes": len(payload.encode())}
+
+        print(f"Sent {report['cells']} cells in {report['ranges']} range(s), {report['bytes']} bytes")
+        count("sheets.write_cells", report["cells"])
+        count("sheets.write_bytes", report["bytes"])
+        return report
 
     except json.JSONEncodeError as e:
         print(f"JSON serialization error: {e}")
@@ -131,3 +343,76 @@ def save_to_sheets(df, sheet):
         print(f"Error: {e}")
         raise
 
+# Column letter(s) for a 1-based column index, e.g. 1 -> A, 27 -> AA
+def column_letter(index):
+    letters = ""
+    while index > 0:
+        index, rest = divmod(index - 1, 26)
+        letters = chr(ord("A") + rest) + letters
+    return letters
+
+# Cells that differ, compared the way Sheets shows them: blanks and None are equal,
+# 1001 equals 1001.0 and "1001"
+def changed_cells(new, old):
+    if new.dtype == old.dtype and new.equals(old):
+        return np.zeros(len(new), dtype=bool)
+
+    new_num, old_num = _numeric_values(new), _numeric_values(old)
+    both_numeric = ~np.isnan(new_num) & ~np.isnan(old_num)
+    if pd.api.types.is_numeric_dtype(new) and pd.api.types.is_numeric_dtype(old):
+        return ~((new.isna() & old.isna()).to_numpy() | (both_numeric & (new_num == old_num)))
+
+    new_text, old_text = new.astype(str).to_numpy(), old.astype(str).to_numpy()
+    new_blank = new.isna().to_numpy() | (new_text == "")
+    old_blank = old.isna().to_numpy() | (old_text == "")
+
+    same = new_blank & old_blank
+    same |= both_numeric & (new_num == old_num)
+    same |= ~both_numeric & ~new_blank & ~old_blank & (new_text == old_text)
+    return ~same
+
+# Float view of a column for numeric comparison; NaN where a cell isn't a number.
+# Only mixed (object) columns are parsed, text columns can't hold numbers.
+def _numeric_values(values):
+    if pd.api.types.is_bool_dtype(values):
+        return values.to_numpy(dtype=float)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=float, na_value=np.nan)
+    if values.dtype == object:
+        return pd.to_numeric(values, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    return np.full(len(values), np.nan)
+
+# Minimal list of (A1 range, column, start row, stop row) covering every changed cell,
+# or None when only a full rewrite is correct (rows or columns were removed).
+# Row positions are 0-based data rows; start -1 means the header cell is included.
+def changed_ranges(df, previous):
+    previous = previous.copy()
+    if "Date" in previous.columns and pd.api.types.is_datetime64_any_dtype(previous["Date"]):
+        datetime_to_string(previous)
+
+    if len(df) < len(previous) or len(df.columns) < len(previous.columns):
+        return None
+
+    old_columns = list(previous.columns)
+    overlap = len(previous)
+    updates = []
+
+    for position, col in enumerate(df.columns):
+        letter = column_letter(position + 1)
+        if position >= len(old_columns) or old_columns[position] != col:
+            # New or moved column: rewrite it together with its header
+            updates.append((f"{letter}1:{letter}{len(df) + 1}", col, -1, len(df)))
+            continue
+
+        changed = np.ones(len(df), dtype=bool)
+        changed[:overlap] = changed_cells(df[col].iloc[:overlap].reset_index(drop=True),
+                                          previous[col].reset_index(drop=True))
+
+        # Start and stop of every run of consecutive changed rows
+        edges = np.diff(np.concatenate(([0], changed.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        stops = np.flatnonzero(edges == -1)
+        for start, stop in zip(starts, stops):
+            updates.append((f"{letter}{start + 2}:{letter}{stop + 1}", col, int(start), int(stop)))
+
+    return updates
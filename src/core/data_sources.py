@@ -0,0 +1,322 @@
+import pandas as pd
+import re
+from abc import ABC, abstractmethod
+from src.utils.config import Config
+from src.core.data_processor import column_letter
+from src.utils.instrumentation import span
+
+scopes = [
+        "https://www.googleapis.com/auth/spreadsheets",
+        "https://www.googleapis.com/auth/drive"
+    ]
+
+
+# gspread and google-auth are imported on first use, so local sources and code paths
+# that never talk to Sheets don't pay for them
+
+# Google Sheets worksheet opened with the service account from credentials.json.
+# Client and worksheet handle are shared process-wide (see sheets_client); `session`
+# replaces the authorized HTTP session, e.g. to talk to a local stand-in of the API.
+class GoogleSheetSource:
+    name = "sheets"
+
+    def __init__(self, spreadsheet_key=None, worksheet=None, credentials_file="credentials.json", session=None):
+        self.spreadsheet_key = spreadsheet_key
+        self.worksheet = worksheet
+        self.credentials_file = credentials_file
+        self.session = session
+
+    def credentials(self):
+        from google.oauth2.service_account import Credentials
+        with span("sheets.credentials"):
+            creds = Credentials.from_service_account_file(self.credentials_file, scopes=scopes)
+        print("Credentials loaded")
+        return creds
+
+    def key(self):
+        if self.spreadsheet_key is not None:
+            return self.spreadsheet_key
+        try:
+            spreadheet_key = Config.SPREADSHEET_KEY
+        except AttributeError:
+            raise ValueError("Spreadsheet key not defined in file: config.py. Please set SPREADSHEET_KEY.")
+
+        if not spreadheet_key:
+            raise ValueError("SPREADSHEET_KEY is empty. Please set it in environment variables or config.py.")
+        return spreadheet_key
+
+    # Identifies the credentials, so sources sharing them share one client
+    def client_key(self):
+        return self.name, self.credentials_file, id(self.session) if self.session is not None else None
+
+    def open(self):
+        from src.core.sheets_client import get_worksheet
+        return get_worksheet(self.client_key(), self.credentials, self.key(), self.worksheet, session=self.session)
+
+    def load(self):
+        sheet = self.open()
+        with span("sheets.fetch"):
+            data = sheet.get_all_records()
+        print(f"Got {len(data)} records")
+        with span("dataframe.build"):
+            df = pd.DataFrame(data)
+
+        if df.empty:
+            raise ValueError("No data in spreadsheet.")
+
+        return df, sheet
+
+    # Reads the sheet in fixed-size row ranges instead of one get_all_records call
+    def iter_chunks(self, chunk_size=None):
+        self.sheet = self.open()
+        yield from iter_worksheet_chunks(self.sheet, chunk_size)
+
+
+# Same sheet, but credentials and key come from Streamlit secrets
+class StreamlitSheetSource(GoogleSheetSource):
+    name = "streamlit"
+
+    def credentials(self):
+        import streamlit as st
+        from google.oauth2.service_account import Credentials
+        with span("sheets.credentials"):
+            return Credentials.from_service_account_info(
+                st.secrets["gcp_service_account"],
+                scopes=scopes
+            )
+
+    def client_key(self):
+        return self.name, id(self.session) if self.session is not None else None
+
+    def key(self):
+        import streamlit as st
+        try:
+            spreadsheet_key = st.secrets["gcp_service_account"]["SPREADSHEET_KEY"]
+        except AttributeError:
+            raise ValueError("Spreadsheet key not defined. Please set SPREADSHEET_KEY.")
+
+        if not spreadsheet_key:
+            raise ValueError("SPREADSHEET_KEY is empty.")
+        return spreadsheet_key
+
+
+# In-memory stand-in for a gspread Worksheet (get_all_records / get_all_values / update / batch_update)
+class FakeWorksheet:
+    def __init__(self, df=None, title="Sheet1"):
+        self.title = title
+        self.update_calls = 0
+        self.batch_calls = 0
+        self._frame = df
+        self._values = None
+
+    def _grid(self):
+        if self._values is None:
+            self._values = frame_to_values(self._frame) if self._frame is not None else []
+            self._frame = None
+        return self._values
+
+    def get_all_values(self):
+        return [list(row) for row in self._grid()]
+
+    def get_all_records(self):
+        values = self._grid()
+        if not values:
+            return []
+        header = values[0]
+        return [dict(zip(header, row + [""] * (len(header) - len(row)))) for row in values[1:]]
+
+    def row_values(self, row):
+        grid = self._grid()
+        return list(grid[row - 1]) if row <= len(grid) else []
+
+    # Cells of an A1 range such as "A2:F1001", "A2:F" (to the last row) or "1:1" (whole row),
+    # trailing empty rows left out like the API does
+    def get(self, range_name, **kwargs):
+        first, _, last = range_name.partition(":")
+        start_row, start_col = a1_bound(first, default_row=1, default_col=1)
+        end_row, end_col = a1_bound(last or first, default_row=None, default_col=None)
+        rows = [row[start_col - 1:end_col] for row in self._grid()[start_row - 1:end_row]]
+        while rows and not any(value != "" for value in rows[-1]):
+            rows.pop()
+        return rows
+
+    def batch_get(self, ranges, **kwargs):
+        return [self.get(range_name, **kwargs) for range_name in ranges]
+
+    def update(self, values, range_name=None):
+        row, col = a1_to_rowcol(range_name.split(":")[0]) if range_name else (1, 1)
+        grid = self._grid()
+        for r, new_row in enumerate(values, start=row - 1):
+            while len(grid) <= r:
+                grid.append([])
+            current = grid[r]
+            end = col - 1 + len(new_row)
+            if len(current) < end:
+                current.extend([""] * (end - len(current)))
+            current[col - 1:end] = new_row
+        self.update_calls += 1
+
+    def batch_update(self, data):
+        for item in data:
+            self.update(item["values"], item["range"])
+        self.batch_calls += 1
+
+    def to_frame(self):
+        return pd.DataFrame(self.get_all_records())
+
+
+# Reads an exported file from disk; writes go to an in-memory FakeWorksheet
+class LocalFileSource(ABC):
+    name = "file"
+
+    def __init__(self, path=None):
+        self.path = path or Config.DATA_PATH
+
+    # The whole file as a DataFrame
+    @abstractmethod
+    def read(self):
+        ...
+
+    def load(self):
+        with span("file.read"):
+            df = self.read()
+        print(f"Got {len(df)} records from {self.path}")
+
+        if df.empty:
+            raise ValueError("No data in file.")
+
+        return df, FakeWorksheet(df, title=str(self.path))
+
+    # DataFrames of up to chunk_size rows each
+    @abstractmethod
+    def read_chunks(self, chunk_size):
+        ...
+
+    # Streams the file; writes go to an empty in-memory worksheet
+    def iter_chunks(self, chunk_size=None):
+        self.sheet = FakeWorksheet(title=str(self.path))
+        yield from self.read_chunks(chunk_size or Config.CHUNK_SIZE)
+
+
+class CsvSource(LocalFileSource):
+    name = "csv"
+
+    def read(self):
+        return pd.read_csv(self.path)
+
+    def read_chunks(self, chunk_size):
+        yield from pd.read_csv(self.path, chunksize=chunk_size)
+
+
+class ParquetSource(LocalFileSource):
+    name = "parquet"
+
+    def read(self):
+        # needs pyarrow or fastparquet installed
+        return pd.read_parquet(self.path)
+
+    def read_chunks(self, chunk_size):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(self.path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+
+
+# Serves data straight from a FakeWorksheet, the offline stand-in for the Sheets API
+class FakeSheetSource:
+    name = "fake"
+
+    def __init__(self, worksheet=None):
+        if worksheet is None:
+            worksheet = FakeWorksheet(pd.read_csv(Config.DATA_PATH))
+        self.worksheet = worksheet
+
+    def load(self):
+        with span("sheets.fetch"):
+            data = self.worksheet.get_all_records()
+        print(f"Got {len(data)} records")
+        with span("dataframe.build"):
+            df = pd.DataFrame(data)
+
+        if df.empty:
+            raise ValueError("No data in spreadsheet.")
+
+        return df, self.worksheet
+
+    def iter_chunks(self, chunk_size=None):
+        self.sheet = self.worksheet
+        yield from iter_worksheet_chunks(self.worksheet, chunk_size)
+
+
+DATA_SOURCES = {
+    "sheets": GoogleSheetSource,
+    "streamlit": StreamlitSheetSource,
+    "csv": CsvSource,
+    "parquet": ParquetSource,
+    "fake": FakeSheetSource,
+}
+
+# Data source selected by name, defaulting to Config.DATA_SOURCE
+def get_data_source(name=None, **kwargs):
+    name = name or Config.DATA_SOURCE
+    try:
+        source_class = DATA_SOURCES[name]
+    except KeyError:
+        raise ValueError(f"Unknown data source: {name}. Choose one of: {list(DATA_SOURCES)}")
+    return source_class(**kwargs)
+
+# DataFrames of up to chunk_size data rows, read range by range below the header row.
+# Numbers come back unformatted and dates as their displayed text, like get_all_records.
+def iter_worksheet_chunks(sheet, chunk_size=None):
+    chunk_size = chunk_size or Config.CHUNK_SIZE
+    header = sheet.row_values(1)
+    if not header:
+        return
+    last_col = column_letter(len(header))
+    start = 2
+    while True:
+        end = start + chunk_size - 1
+        with span("sheets.fetch_chunk"):
+            rows = sheet.get(
+                f"A{start}:{last_col}{end}",
+                value_render_option="UNFORMATTED_VALUE",
+                date_time_render_option="FORMATTED_STRING",
+            )
+        if not rows:
+            return
+        print(f"Got rows {start}-{start + len(rows) - 1}")
+        with span("dataframe.build"):
+            chunk = rows_to_frame(header, rows)
+        yield chunk
+        if len(rows) < chunk_size:
+            return
+        start = end + 1
+
+# The API drops trailing empty cells, so short rows are padded back to the header width
+def rows_to_frame(header, rows):
+    width = len(header)
+    return pd.DataFrame([row + [""] * (width - len(row)) for row in rows], columns=header)
+
+# Header row plus rows, with blanks as "" the way the Sheets API returns them
+def frame_to_values(df):
+    df = df.astype(object).where(df.notna(), "")
+    return [[str(col) for col in df.columns]] + df.values.tolist()
+
+# (row, col) of one side of an A1 range where the row or the column may be left out;
+# a missing part becomes the given default (None meaning unbounded)
+def a1_bound(label, default_row, default_col):
+    match = re.match(r"^([A-Za-z]*)(\d*)$", label)
+    if not match or not label:
+        raise ValueError(f"Invalid A1 range bound: {label}")
+    letters, row = match.groups()
+    col = a1_to_rowcol(f"{letters}1")[1] if letters else default_col
+    return (int(row) if row else default_row), col
+
+def a1_to_rowcol(label):
+    match = re.match(r"^([A-Za-z]+)(\d+)$", label)
+    if not match:
+        raise ValueError(f"Invalid A1 cell label: {label}")
+    letters, row = match.groups()
+    col = 0
+    for letter in letters.upper():
+        col = col * 26 + ord(letter) - ord("A") + 1
+    return int(row), col
@@ -0,0 +1,100 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+import pandas as pd
+from src.utils.config import Config
+from src.core.data_loader import load_data, load_data_chunked
+from src.core.data_processor import validate_data, prepare_orders
+from src.core.data_sources import GoogleSheetSource
+from src.core.analytics import sales_analysis, products_performance, top_customers
+from src.utils.instrumentation import span
+
+
+# Stores from a comma separated spec such as
+#   "Warsaw=1AbC...:Orders, Krakow=9XyZ..., 5QrS...:Region South"
+# Each entry is [name=]spreadsheet_key[:worksheet]; unnamed entries are named after key and worksheet.
+def parse_store_sources(spec=None):
+    spec = Config.SPREADSHEET_KEYS if spec is None else spec
+    sources = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, target = entry.rpartition("=")
+        key, _, worksheet = target.partition(":")
+        name = name.strip() or (f"{key}:{worksheet}" if worksheet else key)
+        sources[name] = GoogleSheetSource(spreadsheet_key=key.strip(), worksheet=worksheet.strip() or None)
+    if not sources:
+        raise ValueError("No stores configured. Please set SPREADSHEET_KEYS.")
+    return sources
+
+def load_store(source):
+    if Config.LOAD_MODE == "chunked":
+        _, clean_df, errors, sheet = load_data_chunked(source, raw=False)
+        return clean_df, errors
+    df, sheet = load_data(source)
+    return validate_data(df)
+
+# Fetches and validates every store concurrently. Returns ({name: (clean_df, errors)}, {name: error})
+def load_fleet(sources, max_workers=None):
+    max_workers = max_workers or Config.FLEET_IO_WORKERS
+    loaded, failed = {}, {}
+    with span("fleet.load"), ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fleet-io") as pool:
+        futures = {pool.submit(load_store, source): name for name, source in sources.items()}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                loaded[name] = future.result()
+            except Exception as e:
+                print(f"Store {name} failed to load: {e}")
+                failed[name] = str(e)
+    return loaded, failed
+
+# Analytics for one store (or the whole fleet). Runs in a worker process, so it only
+# takes and returns picklable values.
+def store_report(orders, time_period=30, top=10):
+    report = {"orders": len(orders), "revenue": orders["Total cost"].sum()}
+    try:
+        report["sales_daily"], report["period_revenue"] = sales_analysis(orders, time_period=time_period)
+    except ValueError as e:
+        report["sales_daily"], report["period_revenue"] = None, 0
+        report["sales_error"] = str(e)
+    report["top_products"] = products_performance(orders, time_period=time_period).head(top)
+    report["top_customers"] = top_customers(orders).head(top)
+    return report
+
+# Per-store reports in a process pool plus a consolidated report over all stores
+def analyze_fleet(frames, time_period=30, processes=None, top=10):
+    processes = processes or Config.FLEET_PROCESSES or os.cpu_count()
+    prepared = {name: prepare_orders(clean_df) for name, (clean_df, errors) in frames.items()}
+
+    stores = {}
+    with span("fleet.analyze"), ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = {pool.submit(store_report, orders, time_period, top): name for name, orders in prepared.items()}
+
+        # The consolidated report is computed here while the workers handle the stores
+        combined = pd.concat(
+            [clean_df.assign(Store=name) for name, (clean_df, errors) in frames.items()],
+            ignore_index=True
+        )
+        consolidated = store_report(prepare_orders(combined), time_period, top)
+
+        for future in as_completed(futures):
+            stores[futures[future]] = future.result()
+
+    summary = pd.DataFrame({
+        name: {
+            "orders": report["orders"],
+            "errors": len(frames[name][1]),
+            "revenue": report["revenue"],
+            f"revenue_last_{time_period}_days": report["period_revenue"],
+        }
+        for name, report in stores.items()
+    }).T.sort_values(by="revenue", ascending=False)
+    summary.index.name = "Store"
+
+    return {"consolidated": consolidated, "stores": stores, "summary": summary}
+
+def run_fleet(spec=None, time_period=30, top=10):
+    frames, failed = load_fleet(parse_store_sources(spec))
+    if not frames:
+        raise ValueError("None of the stores could be loaded.")
+    result = analyze_fleet(frames, time_period=time_period, top=top)
+    result["failed"] = failed
+    return result
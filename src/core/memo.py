@@ -0,0 +1,108 @@
+import functools
+import sys
+import threading
+from collections import OrderedDict
+import pandas as pd
+from src.utils.config import Config
+from src.utils.instrumentation import count
+
+
+# Size-bounded LRU of analytics results (DataFrames, Series, numbers and tuples of them)
+class ResultCache:
+    def __init__(self, max_entries=None):
+        self.max_entries = Config.ANALYTICS_CACHE_SIZE if max_entries is None else max_entries
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    # (True, result) on a hit, (False, None) on a miss
+    def get(self, key):
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._results.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key, result):
+        size = result_size(result)
+        with self._lock:
+            self._results[key] = (result, size)
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / requests, 3) if requests else 0.0,
+                "entries": len(self._results),
+                "bytes": sum(size for _, size in self._results.values()),
+            }
+
+
+result_cache = ResultCache()
+
+# Approximate memory held by a result, in bytes
+def result_size(result):
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(deep=True).sum())
+    if isinstance(result, pd.Series):
+        return int(result.memory_usage(deep=True))
+    if isinstance(result, tuple):
+        return sum(result_size(item) for item in result)
+    return sys.getsizeof(result)
+
+# Callers may modify what they get back, so the cache only ever hands out copies
+def _copy(result):
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return result.copy()
+    if isinstance(result, tuple):
+        return tuple(_copy(item) for item in result)
+    return result
+
+# Caches func's results in result_cache. make_key takes the same arguments as func and
+# returns a hashable key covering everything the result depends on (the data included),
+# or None to call func without caching. Exceptions are never cached. A cache of size 0
+# is off: func is called directly, without computing a key.
+def memoized(name, make_key):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if result_cache.max_entries <= 0:
+                return func(*args, **kwargs)
+            key = make_key(*args, **kwargs)
+            if key is None:
+                return func(*args, **kwargs)
+            key = (name,) + key
+            hit, result = result_cache.get(key)
+            count("result_cache.hit" if hit else "result_cache.miss")
+            if not hit:
+                result = func(*args, **kwargs)
+                result_cache.put(key, _copy(result))
+                return result
+            return _copy(result)
+        return wrapper
+    return decorator
+
+def clear_results():
+    result_cache.clear()
+
+def result_cache_stats():
+    return result_cache.stats()
+
+# One line for /stats and the Streamlit performance panel
+def result_cache_summary():
+    stats = result_cache.stats()
+    return (f"Analytics cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate), "
+            f"{stats['entries']} entries, {stats['bytes'] / 1024:.0f} KiB")
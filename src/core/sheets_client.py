@@ -0,0 +1,151 @@
+import random
+import threading
+import time
+import gspread
+import requests
+from gspread.http_client import HTTPClient
+from requests.adapters import HTTPAdapter
+from src.utils.config import Config
+from src.utils.instrumentation import span, count
+
+# Shared gspread clients and worksheet handles. Opening a sheet costs a credentials read,
+# a token exchange and a metadata request; here that happens once per process, and every
+# later request reuses the client's HTTP connections. All requests go through one token
+# bucket sized to the Sheets quota and are retried with backoff on 429 and 5xx.
+# This module imports gspread, so import it only where a sheet is actually opened.
+
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+# Allows `rate` requests per second on average and bursts of up to `capacity`
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    # Takes a token, sleeping until one is available; returns the seconds waited
+    def acquire(self):
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+sheets_bucket = TokenBucket(Config.SHEETS_REQUESTS_PER_MINUTE / 60, Config.SHEETS_BURST)
+
+# Exponential backoff with full jitter: a random wait between 0 and base * 2^attempt (capped)
+def backoff_delay(attempt):
+    return random.uniform(0, min(Config.SHEETS_BACKOFF_MAX, Config.SHEETS_BACKOFF_BASE * 2 ** attempt))
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+def is_retryable(error):
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) in RETRY_STATUSES
+
+# send() under the rate limit, retried while it fails with a retryable error
+def call_with_retry(send, retries=None, bucket=None):
+    retries = Config.SHEETS_RETRIES if retries is None else retries
+    bucket = bucket or sheets_bucket
+    for attempt in range(retries + 1):
+        waited = bucket.acquire()
+        if waited:
+            count("sheets.throttled_seconds", round(waited, 3))
+        count("sheets.requests")
+        try:
+            return send()
+        except Exception as e:
+            if attempt == retries or not is_retryable(e):
+                raise
+            delay = _retry_after(e) or backoff_delay(attempt)
+            count("sheets.retries")
+            print(f"Sheets request failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+# gspread HTTP client whose every request goes through call_with_retry
+class QuotaHTTPClient(HTTPClient):
+    def __init__(self, auth, session=None):
+        super().__init__(auth, session)
+        self.timeout = Config.SHEETS_TIMEOUT
+        # One pooled connection per thread of the largest consumer (bot workers or fleet
+        # loaders), kept alive between requests
+        pool_size = Config.SHEETS_POOL_SIZE or max(Config.BOT_WORKERS, Config.FLEET_IO_WORKERS)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        for prefix, current in list(self.session.adapters.items()):
+            if type(current) is HTTPAdapter:
+                self.session.mount(prefix, adapter)
+
+    def request(self, *args, **kwargs):
+        return call_with_retry(lambda: HTTPClient.request(self, *args, **kwargs))
+
+
+_clients = {}
+_worksheets = {}
+_locks = {}
+_locks_guard = threading.Lock()
+
+# Lock for one client or worksheet: different sheets open concurrently, while callers
+# arriving together for the same one wait for a single open
+def _lock_for(key):
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+# Shared client for client_key, created with make_credentials() (or over `session`) on first use
+def get_client(client_key, make_credentials, session=None):
+    client = _clients.get(client_key)
+    if client is not None:
+        return client
+    with _lock_for(("client", client_key)):
+        client = _clients.get(client_key)
+        if client is None:
+            creds = make_credentials() if session is None else None
+            with span("sheets.authorize"):
+                client = gspread.Client(auth=creds, session=session, http_client=QuotaHTTPClient)
+            print("Client authorized")
+            _clients[client_key] = client
+        return client
+
+# Shared worksheet handle (sheet1 unless a worksheet title is given)
+def get_worksheet(client_key, make_credentials, spreadsheet_key, worksheet=None, session=None):
+    key = (client_key, spreadsheet_key, worksheet)
+    sheet = _worksheets.get(key)
+    if sheet is not None:
+        count("sheets.handle_reused")
+        return sheet
+    # Opened under the worksheet's lock, so callers arriving together don't each fetch the metadata
+    with _lock_for(("worksheet",) + key):
+        sheet = _worksheets.get(key)
+        if sheet is None:
+            client = get_client(client_key, make_credentials, session)
+            with span("sheets.open"):
+                spreadsheet = client.open_by_key(spreadsheet_key)
+                sheet = spreadsheet.worksheet(worksheet) if worksheet else spreadsheet.sheet1
+            print("Spreadsheet opened")
+            _worksheets[key] = sheet
+        return sheet
+
+# Forget pooled clients and handles, e.g. after credentials change
+def reset_clients():
+    with _locks_guard:
+        _clients.clear()
+        _worksheets.clear()
+        _locks.clear()
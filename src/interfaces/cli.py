@@ -1,15 +1,87 @@
-from src.core.data_processor import validate_data, update_total_cost_column, save_to_sheets
-from src.core.data_loader import load_data
-from src.core.analytics import get_daily_sales, sales_analysis, products_performance, top_customers
-import pandas as pd
-
-def main():
+from src.core.data_processor import update_total_cost_column, save_to_sheets
+from src.core.data_loader import load_validated
+from src.core.analytics import dashboard, generate_diagram
+from src.utils import instrumentation
+import argparse
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sales analytics from the command line")
+    parser.add_argument("--profile", action="store_true", help="print per-stage timings at the end")
+    parser.add_argument("--metrics-file", help="write per-stage timings in Prometheus text format to this file")
+    parser.add_argument("--stores", nargs="?", const="",
+                        help="report over several spreadsheets: [name=]key[:worksheet],... (default: SPREADSHEET_KEYS)")
+    parser.add_argument("--days", type=int, default=30, help="time period for the --stores report")
+    parser.add_argument("--batch", metavar="SPEC",
+                        help="run the reports of a JSON job spec without prompts (see src/core/batch.py)")
+    parser.add_argument("--output-dir", help="where --batch writes its reports (default: the spec's output_dir)")
+    parser.add_argument("--workers", type=int, help="worker processes for --batch (default: BATCH_WORKERS)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.profile or args.metrics_file:
+        instrumentation.enable()
+
+    try:
+        if args.batch:
+            return run_batch_report(args.batch, args.output_dir, args.workers)
+        if args.stores is not None:
+            run_fleet_report(args.stores or None, args.days)
+        else:
+            run_report()
+    finally:
+        if args.profile:
+            print("\nProfile:")
+            print(instrumentation.summary())
+        if args.metrics_file:
+            with open(args.metrics_file, "w") as f:
+                f.write(instrumentation.prometheus_text())
+
+def run_fleet_report(spec, days):
+    # Imported here: the interactive report doesn't need process pools
+    from src.core.fleet import run_fleet
+
+    result = run_fleet(spec, time_period=days)
+    print("\nStores:")
+    print(result["summary"])
+    if result["failed"]:
+        print(f"\nNot loaded: {result['failed']}")
+
+    consolidated = result["consolidated"]
+    print(f"\nAll stores, last {days} days: {consolidated['period_revenue']}")
+    print("\nTop products (all stores):")
+    print(consolidated["top_products"])
+    print("\nTop customers (all stores):")
+    print(consolidated["top_customers"])
+
+    for name, report in result["stores"].items():
+        print(f"\n{name} - top products:")
+        print(report["top_products"])
+
+# Non-interactive: exit status 1 when a job failed, so cron and CI notice
+def run_batch_report(spec_path, output_dir=None, workers=None):
+    from src.core.batch import load_spec, run_batch, summary_table
+
+    summary = run_batch(load_spec(spec_path), output_dir=output_dir, workers=workers)
+    print(summary_table(summary)[["view", "status", "rows", "compute_s", "write_s", "total_s"]])
+    print(f"\nLoad {summary['load_s']:.2f}s, validation {summary['validate_s']:.2f}s, "
+          f"jobs {summary['jobs_s']:.2f}s, total {summary['total_s']:.2f}s")
+    print(f"Reports written to {summary['output_dir']}")
+    if summary["failed"]:
+        print(f"Failed: {summary['failed']}")
+        return 1
+    return 0
+
+# First rows of a table, or the error a dashboard view ended with
+def head(result, n=5):
+    return result if isinstance(result, Exception) else result.head(n)
+
+def run_report():
     print("Loading data...")
-    df, sheet = load_data()
+    df, clean_df, errors_list, sheet = load_validated()
     print(f"Success: {len(df)} rows loaded!")
 
-    # Data validation
-    clean_df, errors_list = validate_data(df)
+    # Data validation (done while loading: chunk by chunk with LOAD_MODE=chunked)
     if errors_list:
         print(f"Errors: {errors_list[:5]}")
     else:
@@ -17,45 +89,56 @@ def main():
 
     print(f"Cleaned data: {len(clean_df)} rows")
 
+    # Last known sheet contents, so writes only send cells that changed
+    sheet_state = df
+
     if input("Write error flags to Sheets? (y/n): ") == 'y':
-        save_to_sheets(clean_df, sheet)
+        save_to_sheets(clean_df, sheet, previous=sheet_state)
+        sheet_state = clean_df.copy()
 
     if input("Write total order costs to Sheets? (y/n): ") == 'y':
         update_total_cost_column(clean_df)
-        save_to_sheets(clean_df, sheet)
+        save_to_sheets(clean_df, sheet, previous=sheet_state)
         print("Saved")
 
     print("\nData Analysis:")
 
+    # Every view below comes from one prepared copy of the data and one pass over it
+    results = dashboard(clean_df, {
+        "daily_sales": ("daily", {}),
+        "sales_30_days": ("sales", {"time_period": 30}),
+        "sales_period": ("sales", {"start_date": "2025-08-06", "end_date": "2025-08-15"}),
+        "top_products": ("products", {}),
+        "top_products_period": ("products", {"start_date": "2025-08-06", "end_date": "2025-08-15"}),
+        "best_customers": ("customers", {}),
+    })
+
     # Daily sales analysis
-    daily_sales = get_daily_sales(clean_df)
+    daily_sales = results["daily_sales"]
     print("Daily Sales:")
     print(daily_sales.tail(7))
+    if input("Do you want to generate diagram? (y/n): ") == 'y':
+        title = input("Title: ").strip()
+        generate_diagram(title=title or "Daily sales report", data=daily_sales)
 
     # Sales analysis for the last 30 days
-    sales_30_days = sales_analysis(clean_df, time_period=30)
     print("\nSales (last 30 days):")
-    print(sales_30_days)
+    print(results["sales_30_days"])
 
     #  Sales analysis for a selected period
-    sales_period = sales_analysis(clean_df, start_date="2025-08-06", end_date="2025-08-15")
     print("\nSales (2025-08-06 to 2025-08-15):")
-    print(sales_period)
+    print(results["sales_period"])
 
     # Top products for all time
-    top_products = products_performance(clean_df)
-    #time_period=30
-    # print("\nTop Products for last 30 days ")
-    print(top_products.head())
+    print(head(results["top_products"]))
 
     # # Top products for a selected period
-    top_products = products_performance(clean_df, start_date="2025-08-06", end_date="2025-08-15")
     print("\nTop products (2025-08-06 to 2025-08-15):")
+    print(head(results["top_products_period"]))
 
     # # Top customers
-    best_customers = top_customers(clean_df)
     print("\nTop Customers:")
-    print(best_customers.head())
+    print(head(results["best_customers"]))
 
     # Test
     # empty_df = pd.DataFrame()
@@ -70,4 +153,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    raise SystemExit(main())
\ No newline at end of file
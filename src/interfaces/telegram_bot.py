@@ -1,14 +1,24 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+import asyncio
+import html
+import json
 import logging
+import os
+import time
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from telegram import Update, InlineQueryResultArticle, InputTextMessageContent
+from telegram.error import Forbidden, RetryAfter
 from telegram.ext import filters, ApplicationBuilder, ContextTypes, CommandHandler, MessageHandler, InlineQueryHandler
 from src.utils.config import Config
 
-from src.core.data_loader import load_data
-from src.core.data_processor import validate_data, update_total_cost_column
-from src.core.analytics import sales_analysis, products_performance
+from src.core.data_loader import load_orders, get_dataset, peek_dataset, dataset_memory_summary
+from src.core.answers import AnswerIndex
+from src.core.charts import cached_png, warm_up_renderer
+from src.core.memo import result_cache_summary
+from src.utils import instrumentation
+from src.core.analytics import sales_analysis, sales_trend, top_products_page
 
-import plotly.express as px
 import io
 
 logging.basicConfig(
@@ -16,16 +26,83 @@ logging.basicConfig(
     level=logging.INFO
 )
 
+BUSY_MESSAGE = "I'm busy with other requests right now, please try again in a moment."
+
+# Data loading, pandas and chart rendering run here so the event loop keeps serving other chats
+executor = ThreadPoolExecutor(max_workers=Config.BOT_WORKERS, thread_name_prefix="bot-worker")
+_inflight = {}
+
+
+class BotBusy(Exception):
+    pass
+
+
+# Runs func(*args) in the worker pool. Requests with the same key share one computation;
+# once Config.BOT_MAX_PENDING computations are queued, new ones raise BotBusy.
+async def run_blocking(key, func, *args):
+    future = _inflight.get(key)
+    if future is None:
+        if len(_inflight) >= Config.BOT_MAX_PENDING:
+            raise BotBusy()
+        future = asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        _inflight[key] = future
+        future.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield: one impatient caller being cancelled must not cancel the shared result
+    return await asyncio.shield(future)
+
+
+# Blocking report builders, executed in the worker pool
+
+def daily_sales_report(days):
+    orders = load_orders()
+    sales_daily, total_cost = sales_analysis(orders, time_period=days)
+    return f"\nTotal sales:\n{total_cost} \nDaily sales: {sales_daily} "
+
+def trend_chart(days):
+    dataset = get_dataset()
+
+    def build_figure():
+        import plotly.express as px
+        rolling = min(7, days)
+        trend, windows = sales_trend(dataset.orders, days=days, windows=(days,), rolling=(rolling,))
+        trend["Date"] = trend["Date"].dt.strftime("%Y-%m-%d")
+        change = windows.loc[days, "change_pct"]
+        title = f"Sales trend {days} days: {windows.loc[days, 'total']:,.0f}"
+        if pd.notna(change):
+            title += f" ({change:+.1f}% vs previous {days} days)"
+        return px.line(trend, x="Date", y=["Total cost", f"avg_{rolling}d"], title=title)
+
+    # "Last N days" moves with the calendar, so today's date is part of the key
+    return cached_png(("trend", days, dataset.fingerprint, date.today()), build_figure)
+
+def top_products_report(days, page=1):
+    orders = load_orders()
+    page_size = Config.TOP_PAGE_SIZE
+    top_products, total = top_products_page(orders, n=page_size, offset=(page - 1) * page_size, time_period=days)
+    pages = max(1, -(-total // page_size))
+
+    top_products_reset = top_products.reset_index()
+    msg = f"Top products from {days} days (page {page}/{pages}):\n"
+    for i, row in top_products_reset.iterrows():
+        msg += f"{row['Product']}: quantity={row['total_quantity']}, orders={row['num_orders']}, revenue={row['total_revenue']}\n"
+    if page < pages:
+        msg += f"More: /top_products {days} {page + 1}"
+    return msg
+
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await context.bot.send_message(chat_id=update.effective_chat.id, text="I'm a bot, please talk to me!")
 
 async def daily_sales(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    df, sheet = load_data()
-    clean_df, errors = validate_data(df)
-    daily = sales_analysis(clean_df, time_period=7)
-    daily_sum =daily["Total cost"].sum()
+    days = Config.DEFAULT_DAILY_DAYS
+    try:
+        text = await run_blocking(("daily_sales", days), daily_sales_report, days)
+    except BotBusy:
+        text = BUSY_MESSAGE
+    except Exception as e:
+        text = f"Error: {e}"
 
-    await context.bot.send_message(chat_id=update.effective_chat.id, text=f"\nTotal sales:\n{daily_sum} \nDaily sales: {daily} ")
+    await context.bot.send_message(chat_id=update.effective_chat.id, text=text)
 
 async def trend(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
@@ -34,57 +111,281 @@ async def trend(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
         days = int(context.args[0])
 
-        df, sheet = load_data()
-        clean_df, errors = validate_data(df)
-        sales_daily = sales_analysis(clean_df, time_period=days)
-
-        sales_daily["Date"] = sales_daily["Date"].dt.strftime("%Y-%m-%d")
-
-        fig = px.line(sales_daily, x="Date", y="Total cost", title=f"Sales trend {days} days")
-        img_bytes = io.BytesIO()
-        fig.write_image(img_bytes, format="png")
-        img_bytes.seek(0)
-        await update.message.reply_photo(photo=img_bytes)
+        png = await run_blocking(("trend", days), trend_chart, days)
+        await update.message.reply_photo(photo=io.BytesIO(png))
 
+    except BotBusy:
+        await update.message.reply_text(BUSY_MESSAGE)
     except Exception as e:
         await update.message.reply_text(f"Error: {e}")
 
 async def top_products(update: Update, context:ContextTypes.DEFAULT_TYPE):
     if not context.args:
-        await update.message.reply_to_message("How to use: /top_products <number_of_days>")
+        await update.message.reply_text("How to use: /top_products <number_of_days> [page]")
         return
     days = int(context.args[0])
+    page = max(1, int(context.args[1])) if len(context.args) > 1 else 1
 
-    df, sheet = load_data()
-    clean_df, errors = validate_data(df)
-    top_products = products_performance(clean_df, days)
-
-    top_products_reset = top_products.reset_index()
-    msg = f"Top products from {days} days:\n"
-    for i, row in top_products_reset.iterrows():
-        msg += f"{row['Product']}: quantity={row['total_quantity']}, orders={row['num_orders']}, revenue={row['total_revenue']}\n"
+    try:
+        msg = await run_blocking(("top_products", days, page), top_products_report, days, page)
+    except BotBusy:
+        msg = BUSY_MESSAGE
+    except Exception as e:
+        msg = f"Error: {e}"
     await update.message.reply_text(msg)
 
+# Scheduled reports: computed once per tick, then pushed to every subscribed chat
+
+latest_reports = {}
+
+def load_subscribers():
+    if not os.path.exists(Config.SUBSCRIBERS_FILE):
+        return set()
+    with open(Config.SUBSCRIBERS_FILE) as f:
+        return set(json.load(f))
+
+def save_subscribers():
+    with open(Config.SUBSCRIBERS_FILE, "w") as f:
+        json.dump(sorted(subscribers), f)
+
+subscribers = load_subscribers()
+
+# Blocking: daily, weekly and trend reports from one load of the data
+def build_scheduled_reports():
+    reports = {"computed_at": datetime.now()}
+    for name, days in [("daily", 1), ("weekly", 7)]:
+        try:
+            reports[name] = f"Last {days} day(s):" + daily_sales_report(days)
+        except Exception as e:
+            reports[name] = f"Last {days} day(s): {e}"
+    try:
+        reports["trend_png"] = trend_chart(Config.DEFAULT_TREND_DAYS)
+    except Exception as e:
+        logging.warning(f"Scheduled trend chart failed: {e}")
+        reports["trend_png"] = None
+    return reports
+
+
+# Spaces out calls so that at most `rate` start per second
+class RateLimiter:
+    def __init__(self, rate):
+        self.interval = 1 / rate
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            delay = self._next - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next = max(loop.time(), self._next) + self.interval
+
+# send(**kwargs) under the rate limit; raises the last RetryAfter once three attempts were throttled
+async def send_with_retry(send, limiter, **kwargs):
+    for attempt in range(3):
+        await limiter.wait()
+        try:
+            return await send(**kwargs)
+        except RetryAfter as e:
+            if attempt == 2:
+                raise
+            await asyncio.sleep(e.retry_after)
+
+async def push_reports(bot, reports, chat_ids):
+    text = f"{reports['daily']}\n\n{reports['weekly']}"
+    limiter = RateLimiter(Config.BROADCAST_RATE)
+    semaphore = asyncio.Semaphore(Config.BROADCAST_CONCURRENCY)
+    photo = reports.get("trend_png")
+
+    async def push(chat_id):
+        nonlocal photo
+        async with semaphore:
+            try:
+                await send_with_retry(bot.send_message, limiter, chat_id=chat_id, text=text)
+                if photo is not None:
+                    message = await send_with_retry(bot.send_photo, limiter, chat_id=chat_id, photo=photo)
+                    # After the first upload the chart is re-sent by file_id instead of as bytes
+                    if isinstance(photo, bytes):
+                        photo = message.photo[-1].file_id
+                return True
+            except Forbidden:
+                # The user blocked the bot or left the chat
+                subscribers.discard(chat_id)
+                return False
+            except Exception as e:
+                logging.warning(f"Sending report to {chat_id} failed: {e}")
+                return False
+
+    chat_ids = list(chat_ids)
+    if not chat_ids:
+        return 0
+    # First chat alone, so the photo is uploaded once
+    sent = [await push(chat_ids[0])]
+    sent += await asyncio.gather(*(push(chat_id) for chat_id in chat_ids[1:]))
+    save_subscribers()
+    return sum(sent)
+
+def load_last_report_time():
+    if not os.path.exists(Config.REPORT_STATE_FILE):
+        return None
+    with open(Config.REPORT_STATE_FILE) as f:
+        return datetime.fromisoformat(json.load(f)["last_run"])
+
+def save_last_report_time(when):
+    with open(Config.REPORT_STATE_FILE, "w") as f:
+        json.dump({"last_run": when.isoformat()}, f)
+
+# When the report after last_run is due: REPORT_INTERVAL later, or right away if that was
+# missed while the bot was down. Without a recorded run, the next wall-clock multiple of
+# the interval (midnight UTC for a day), so a restart never sends a report by itself.
+def next_report_time(last_run, now):
+    if last_run is not None:
+        return max(last_run + timedelta(seconds=Config.REPORT_INTERVAL), now)
+    return now + timedelta(seconds=Config.REPORT_INTERVAL - now.timestamp() % Config.REPORT_INTERVAL)
+
+async def report_scheduler(application):
+    due = next_report_time(load_last_report_time(), datetime.now())
+    logging.info(f"Next scheduled report at {due:%Y-%m-%d %H:%M}")
+    while True:
+        await asyncio.sleep(max(0.0, (due - datetime.now()).total_seconds()))
+        try:
+            reports = await run_blocking(("scheduled_reports",), build_scheduled_reports)
+            latest_reports.clear()
+            latest_reports.update(reports)
+            sent = await push_reports(application.bot, reports, sorted(subscribers))
+            logging.info(f"Scheduled reports sent to {sent}/{len(subscribers)} subscribers")
+        except BotBusy:
+            # Every worker is taken: try again shortly instead of skipping a whole interval
+            logging.info(f"Workers busy at report time, retrying in {Config.REPORT_RETRY_DELAY}s")
+            await asyncio.sleep(Config.REPORT_RETRY_DELAY)
+            continue
+        except Exception as e:
+            logging.error(f"Scheduled reports failed: {e}")
+        # Recorded as the slot it served, so ticks don't drift by the time reports take
+        save_last_report_time(due)
+        due = next_report_time(due, datetime.now())
+
+async def start_scheduler(application):
+    application.create_task(report_scheduler(application))
+    application.create_task(refresh_answers())
+
+async def subscribe(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    subscribers.add(update.effective_chat.id)
+    save_subscribers()
+    await update.message.reply_text("Subscribed to scheduled sales reports. /unsubscribe to stop.")
+
+async def unsubscribe(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    subscribers.discard(update.effective_chat.id)
+    save_subscribers()
+    await update.message.reply_text("Unsubscribed from scheduled sales reports.")
+
+# Latest scheduled reports, without computing anything
+async def report(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not latest_reports:
+        await update.message.reply_text("No scheduled report yet, try /daily_sales.")
+        return
+    computed_at = latest_reports["computed_at"].strftime("%Y-%m-%d %H:%M")
+    await update.message.reply_text(f"Report from {computed_at}\n{latest_reports['daily']}\n\n{latest_reports['weekly']}")
+    if latest_reports.get("trend_png") is not None:
+        await update.message.reply_photo(photo=latest_reports["trend_png"])
+
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    try:
+        # Deep memory usage walks every string once per dataset, so it runs in the pool
+        memory = await run_blocking(("dataset_memory",), dataset_memory_summary)
+    except BotBusy:
+        memory = BUSY_MESSAGE
+    text = f"{instrumentation.summary()}\n\n{result_cache_summary()}\n{memory}"
+    await update.message.reply_text(f"<pre>{html.escape(text)}</pre>", parse_mode="HTML")
+
+# Inline queries (@bot product Webcam, @bot customer Paweł, @bot sales 7d) are answered from
+# an index of precomputed answers. Queries never load data; a stale index is rebuilt in the
+# worker pool while the current one keeps answering.
+
+answer_index = None
+
+# Blocking: reloads the data once its TTL has passed and rebuilds the index if it changed
+def refresh_answer_index():
+    global answer_index
+    dataset = get_dataset()
+    if answer_index is None or answer_index.is_stale(dataset.version):
+        answer_index = AnswerIndex(dataset.orders, dataset.version)
+        logging.info(f"Inline answer index built for data version {dataset.version}")
+    answer_index.checked_at = time.monotonic()
+    return answer_index
+
+async def refresh_answers():
+    try:
+        await run_blocking(("answer_index",), refresh_answer_index)
+    except BotBusy:
+        pass
+    except Exception as e:
+        logging.warning(f"Inline answer index refresh failed: {e}")
+
+def answers_outdated(index):
+    if index is None:
+        return True
+    dataset = peek_dataset()
+    return (index.is_stale(dataset.version if dataset is not None else None)
+            or time.monotonic() - index.checked_at > Config.DATA_CACHE_TTL)
+
+async def inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    index = answer_index
+    if answers_outdated(index) and ("answer_index",) not in _inflight:
+        context.application.create_task(refresh_answers())
+
+    if index is None:
+        loading = InlineQueryResultArticle(
+            id="loading", title="Loading sales data...", description="Try again in a moment",
+            input_message_content=InputTextMessageContent("Sales data is still loading, try again in a moment."),
+        )
+        await update.inline_query.answer([loading], cache_time=0)
+        return
+
+    with instrumentation.span("bot.inline_query"):
+        results = [
+            InlineQueryResultArticle(
+                id=answer["id"], title=answer["title"], description=answer["description"],
+                input_message_content=InputTextMessageContent(answer["text"]),
+            )
+            for answer in index.answer(update.inline_query.query)
+        ]
+    await update.inline_query.answer(results, cache_time=Config.INLINE_CACHE_TIME)
+
 async def unknown(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await context.bot.send_message(chat_id=update.effective_chat.id, text="Sorry, I didn't understand that command.")
 
 
 if __name__ == '__main__':
-    application = ApplicationBuilder().token(Config.TELEGRAM_TOKEN).build()
+    application = ApplicationBuilder().token(Config.TELEGRAM_TOKEN).post_init(start_scheduler).build()
 
     # Listening to /start command
     start_handler = CommandHandler('start', start)
     daily_sales_handler = CommandHandler('daily_sales', daily_sales)
     trend_handler = CommandHandler('trend', trend)
     top_products_handler = CommandHandler('top_products', top_products)
+    stats_handler = CommandHandler('stats', stats)
+    subscribe_handler = CommandHandler('subscribe', subscribe)
+    unsubscribe_handler = CommandHandler('unsubscribe', unsubscribe)
+    report_handler = CommandHandler('report', report)
+    inline_handler = InlineQueryHandler(inline_query)
     unknown_handler = MessageHandler(filters.COMMAND, unknown)
 
     application.add_handler(start_handler)
     application.add_handler(daily_sales_handler)
     application.add_handler(trend_handler)
     application.add_handler(top_products_handler)
+    application.add_handler(stats_handler)
+    application.add_handler(subscribe_handler)
+    application.add_handler(unsubscribe_handler)
+    application.add_handler(report_handler)
+    application.add_handler(inline_handler)
     application.add_handler(unknown_handler)
 
+    # Render a throwaway chart in the background so the first /trend starts warm
+    executor.submit(warm_up_renderer)
+
     application.run_polling()
 
 
@@ -6,19 +6,86 @@ ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
-from src.core.data_loader import load_data_web
-from src.core.analytics import get_daily_sales, sales_analysis, products_performance, top_customers
-from src.core.data_processor import validate_data, update_total_cost_column, save_to_sheets
+from src.core.data_loader import load_data_web, get_dataset, invalidate_data_cache, dataset_memory_summary
+from src.core.analytics import get_daily_sales, sales_analysis, sales_trend, top_products_page, top_customers_page, orders_page
+from src.core.data_processor import update_total_cost_column, save_to_sheets
+from src.core.memo import result_cache_summary
+from src.core.answers import NameIndex
+from src.utils import instrumentation
+from src.utils.config import Config
 import pandas as pd
-import matplotlib.pyplot as plt
 import streamlit as st
 import numpy as np
 from datetime import date
 
 
+# Ranked table shown one page at a time; fetch_page(n=, by=, offset=) returns (page, total rows)
+def show_ranked_page(fetch_page, metrics, key):
+    by = st.selectbox("Sort by", metrics, key=f"{key}_by")
+    page_size = st.number_input("Rows per page", min_value=5, max_value=200, value=Config.TOP_PAGE_SIZE, step=5, key=f"{key}_size")
+    page = st.number_input("Page", min_value=1, value=1, step=1, key=f"{key}_page")
+
+    rows, total = fetch_page(n=page_size, by=by, offset=(page - 1) * page_size)
+    st.caption(f"Page {page} of {max(1, -(-total // page_size))} ({total} rows)")
+    st.dataframe(rows)
+
+# Order table browser: filtering, sorting and slicing run on the server and only the
+# current page is sent to the browser. Products and customers are filtered by name prefix
+# rather than picked from a list, so the names never have to be sent either.
+def show_orders_explorer(orders, version):
+    dated = orders["Date"].dropna()
+    first_day = dated.min().date() if not dated.empty else date.today()
+    last_day = dated.max().date() if not dated.empty else date.today()
+
+    col1, col2, col3 = st.columns(3)
+    date_range = col1.date_input("Dates", (first_day, last_day), key="explorer_dates")
+    products = _matching_names(orders, version, "Product", col2.text_input("Product name starts with", key="explorer_products"))
+    customers = _matching_names(orders, version, "CustomerName", col3.text_input("Customer name starts with", key="explorer_customers"))
+
+    col1, col2, col3, col4 = st.columns(4)
+    errors_only = col1.checkbox("Only rows with errors", key="explorer_errors")
+    sort_by = col2.selectbox("Sort by", ["---"] + list(orders.columns), key="explorer_sort")
+    descending = col3.checkbox("Descending", key="explorer_desc")
+    page_size = col4.number_input("Rows per page", min_value=10, max_value=500, value=Config.EXPLORER_PAGE_SIZE, step=10, key="explorer_size")
+
+    # The date input holds one date while a range is being picked
+    start_date, end_date = (list(date_range) + [None, None])[:2]
+    page = st.number_input("Page", min_value=1, value=1, step=1, key="explorer_page")
+
+    if (products is not None and not len(products)) or (customers is not None and not len(customers)):
+        st.caption("No product or customer name matches the filter")
+        return
+    rows, total = orders_page(
+        orders, start_date=start_date, end_date=end_date, products=products, customers=customers,
+        errors_only=errors_only, sort_by=None if sort_by == "---" else sort_by, ascending=not descending,
+        offset=(page - 1) * page_size, limit=page_size)
+    st.caption(f"Page {page} of {max(1, -(-total // page_size))} ({total} matching rows)")
+    st.dataframe(rows)
+
+def _options(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return list(values.cat.categories)
+    return sorted(values.dropna().unique())
+
+# Distinct names of a column with a prefix index over them, built once per dataset version
+@st.cache_resource(max_entries=4)
+def _name_index(version, column, _orders):
+    names = np.array(_options(_orders[column]), dtype=object)
+    return names, NameIndex(names, np.arange(len(names)))
+
+# Names in column with a word starting with prefix; None when there's nothing to filter by
+def _matching_names(orders, version, column, prefix):
+    if not prefix.strip():
+        return None
+    names, index = _name_index(version, column, orders)
+    return names[index.search(prefix, len(names))]
+
 def main():
-    df, sheet = load_data_web()
-    clean_df, errors_list = validate_data(df)
+    # Shared across reruns; copy before anything that modifies the frame in place.
+    # dataset.clean_df is rebuilt on each access, so it's only read to write back.
+    dataset = get_dataset(load_data_web)
+    df, errors_list, sheet = dataset.df, dataset.errors, dataset.sheet
+    orders = dataset.orders
 
     if errors_list:
         st.write("Data loaded succesfully!")
@@ -30,7 +97,8 @@ def main():
             index=1
         )
         if add_radio == "Yes":
-            save_to_sheets(clean_df, sheet)
+            save_to_sheets(dataset.clean_df, sheet, previous=df)
+            invalidate_data_cache(load_data_web)
 
     add_radio2 = st.sidebar.radio(
         'Do you want me to write total order costs to Sheets?',
@@ -39,12 +107,13 @@ def main():
         )
 
     if add_radio2 == "Yes":
+        clean_df = dataset.clean_df
         update_total_cost_column(clean_df)
-        save_to_sheets(clean_df, sheet)
+        save_to_sheets(clean_df, sheet, previous=df)
+        invalidate_data_cache(load_data_web)
 
     if st.checkbox('Show data:'):
-        chart_data = clean_df
-        st.dataframe(chart_data)
+        show_orders_explorer(orders, dataset.version)
 
     option_analysis = st.selectbox(
         "Now we can start analyzing. What would you want to see?", # Pokazywać dopiero po przygptpwaniu danych?
@@ -60,18 +129,24 @@ def main():
         )
         if option_time == 'Last X days':
             days=st.number_input("Days", min_value=1, max_value=365, value=7, step=1)
-            daily, total_cost = sales_analysis(clean_df, time_period=days)
-
-            if daily.empty:
-                st.warning("No sales in this period")
+            try:
+                trend, windows = sales_trend(orders, days=days, windows=(7, 30, 90, days), rolling=(7, 28))
+            except ValueError as e:
+                st.warning(f"No sales in this period ({e})")
             else:
-                st.write(f"Cost of orders: {total_cost}")
-                st.dataframe(daily)
+                st.write(f"Cost of orders: {windows.loc[days, 'total']}")
+                # Each window against the same number of days before it
+                for column, (window, row) in zip(st.columns(len(windows)), windows.iterrows()):
+                    change = row["change_pct"]
+                    column.metric(f"Last {window} days", f"{row['total']:,.0f}",
+                                  delta=f"{change:+.1f}%" if pd.notna(change) else None)
+                st.line_chart(trend.set_index("Date"))
+                st.dataframe(trend)
 
         if option_time == "From X date to Y date":
             start_date = st.date_input("Start date", date.today())
             end_date = st.date_input("End date", date.today())
-            daily, total_cost = sales_analysis(clean_df, start_date=start_date, end_date=end_date)
+            daily, total_cost = sales_analysis(orders, start_date=start_date, end_date=end_date)
 
             if daily.empty:
                 st.warning("No sales in this period")
@@ -85,13 +160,22 @@ def main():
         )
         if option_time == 'Last X days':
             days=st.number_input("Days", min_value=1, max_value=365, value=7, step=1)
-            top_products = products_performance(clean_df, time_period=days)
-            st.dataframe(top_products)
+            show_ranked_page(
+                lambda **page: top_products_page(orders, time_period=days, **page),
+                ["total_quantity", "num_orders", "total_revenue"], key="products")
         if option_time == "From X date to Y date":
             start_date = st.date_input("Start date", date.today())
             end_date = st.date_input("End date", date.today())
-            top_products = products_performance(clean_df, start_date=start_date, end_date=end_date)
-            st.dataframe(top_products)
+            show_ranked_page(
+                lambda **page: top_products_page(orders, start_date=start_date, end_date=end_date, **page),
+                ["total_quantity", "num_orders", "total_revenue"], key="products")
     elif option_analysis == "Top customers":
-        filtered_customers = top_customers(clean_df)
-        st.dataframe(filtered_customers)
+        show_ranked_page(
+            lambda **page: top_customers_page(orders, **page),
+            ["num_orders", "orders_cost", "days_since_last_order"], key="customers")
+
+    with st.expander("Performance"):
+        st.text(instrumentation.summary())
+        st.text(result_cache_summary())
+        st.text(dataset_memory_summary(load_data_web))
+        st.download_button("Download metrics (Prometheus)", instrumentation.prometheus_text(), file_name="metrics.txt")
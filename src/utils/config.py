@@ -5,10 +5,81 @@ load_dotenv()
 
 class Config:
     SPREADSHEET_KEY = os.getenv('SPREADSHEET_KEY')
+    # Fleet mode: comma separated [name=]spreadsheet_key[:worksheet] entries, one per store
+    SPREADSHEET_KEYS = os.getenv('SPREADSHEET_KEYS', '')
+    FLEET_IO_WORKERS = int(os.getenv('FLEET_IO_WORKERS', 8))
+    FLEET_PROCESSES = int(os.getenv('FLEET_PROCESSES', 0))  # 0: one per CPU core
+    # Headless batch reports (cli --batch): worker processes (0: one per CPU core) and default output directory
+    BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', 0))
+    BATCH_OUTPUT_DIR = os.getenv('BATCH_OUTPUT_DIR', 'reports')
     TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 
+    # Sheets API: requests per minute (the per-user read quota is 60), burst size, retries on
+    # 429/5xx with exponential backoff between SHEETS_BACKOFF_BASE and SHEETS_BACKOFF_MAX seconds
+    SHEETS_REQUESTS_PER_MINUTE = float(os.getenv('SHEETS_REQUESTS_PER_MINUTE', 60))
+    SHEETS_BURST = int(os.getenv('SHEETS_BURST', 10))
+    SHEETS_RETRIES = int(os.getenv('SHEETS_RETRIES', 5))
+    SHEETS_BACKOFF_BASE = float(os.getenv('SHEETS_BACKOFF_BASE', 1))
+    SHEETS_BACKOFF_MAX = float(os.getenv('SHEETS_BACKOFF_MAX', 32))
+    SHEETS_TIMEOUT = float(os.getenv('SHEETS_TIMEOUT', 30))
+    # Kept-alive connections per client; 0: as many as the largest thread pool using it (BOT_WORKERS, FLEET_IO_WORKERS)
+    SHEETS_POOL_SIZE = int(os.getenv('SHEETS_POOL_SIZE', 0))
+
+    # Where orders are read from: sheets, csv, parquet or fake (in-memory worksheet)
+    DATA_SOURCE = os.getenv('DATA_SOURCE', 'sheets')
+    DATA_PATH = os.getenv('DATA_PATH', 'data/orders_demo.csv')
+    # Parquet file with per-row hashes and error flags of the last validation, e.g. .cache/validation.parquet;
+    # when set, unchanged rows aren't re-checked. Empty disables it.
+    VALIDATION_SNAPSHOT = os.getenv('VALIDATION_SNAPSHOT', '')
+    # "append": after the first load only rows appended to the sheet are fetched (see SheetSync);
+    # "full": every refresh downloads the whole sheet
+    SYNC_MODE = os.getenv('SYNC_MODE', 'full')
+    # Trailing rows compared on every sync, and how many syncs run before a full reload
+    SYNC_TAIL_ROWS = int(os.getenv('SYNC_TAIL_ROWS', 20))
+    SYNC_FULL_EVERY = int(os.getenv('SYNC_FULL_EVERY', 50))
+    # Rows per request/batch for the streaming loader
+    CHUNK_SIZE = int(os.getenv('CHUNK_SIZE', 5000))
+    # "chunked": loads read the sheet CHUNK_SIZE rows per request and validate each chunk as it
+    # arrives (without the validation snapshot); "full": one get_all_records response, validated whole
+    LOAD_MODE = os.getenv('LOAD_MODE', 'full')
+
     CHART_WIDTH = 800
     CHART_HEIGHT = 500
+    # Rendered chart PNGs kept in memory (LRU)
+    CHART_CACHE_SIZE = int(os.getenv('CHART_CACHE_SIZE', 64))
+
+    # Analytics results kept in memory (LRU), keyed by query and dataset fingerprint; 0 turns the cache off
+    ANALYTICS_CACHE_SIZE = int(os.getenv('ANALYTICS_CACHE_SIZE', 128))
 
     DEFAULT_TREND_DAYS = 30
-    DEFAULT_DAILY_DAYS = 7
\ No newline at end of file
+    DEFAULT_DAILY_DAYS = 7
+    # Rows per page of top products / customers in the bot and the web app
+    TOP_PAGE_SIZE = int(os.getenv('TOP_PAGE_SIZE', 10))
+    # Rows per page of the order table in the web app's data explorer
+    EXPLORER_PAGE_SIZE = int(os.getenv('EXPLORER_PAGE_SIZE', 50))
+
+    # Inline queries (@bot product ..., customer ..., sales 7d): results per answer, the "sales" windows
+    # shown by default, the longest window answered, and seconds Telegram may cache an answer
+    INLINE_RESULTS = int(os.getenv('INLINE_RESULTS', 10))
+    INLINE_WINDOWS = [int(days) for days in os.getenv('INLINE_WINDOWS', '1,7,30').split(',')]
+    INLINE_MAX_DAYS = int(os.getenv('INLINE_MAX_DAYS', 365))
+    INLINE_CACHE_TIME = int(os.getenv('INLINE_CACHE_TIME', 60))
+
+    # Telegram bot worker threads and how many distinct computations may queue before replying "busy"
+    BOT_WORKERS = int(os.getenv('BOT_WORKERS', 4))
+    BOT_MAX_PENDING = int(os.getenv('BOT_MAX_PENDING', 32))
+
+    # Scheduled reports: seconds between runs, subscriber list, and how fast they are sent out
+    REPORT_INTERVAL = int(os.getenv('REPORT_INTERVAL', 24 * 60 * 60))
+    SUBSCRIBERS_FILE = os.getenv('SUBSCRIBERS_FILE', 'subscribers.json')
+    # Time of the last scheduled run, so restarts don't send it again; seconds before retrying a busy run
+    REPORT_STATE_FILE = os.getenv('REPORT_STATE_FILE', 'report_state.json')
+    REPORT_RETRY_DELAY = int(os.getenv('REPORT_RETRY_DELAY', 60))
+    BROADCAST_CONCURRENCY = int(os.getenv('BROADCAST_CONCURRENCY', 10))
+    BROADCAST_RATE = float(os.getenv('BROADCAST_RATE', 25))  # messages per second, Telegram allows about 30
+
+    # Record per-stage timings (shown by /stats, the Streamlit panel and cli --profile)
+    PROFILING = os.getenv('PROFILING', '0') == '1'
+
+    # Seconds a loaded and validated dataset is reused before fetching the sheet again
+    DATA_CACHE_TTL = int(os.getenv('DATA_CACHE_TTL', 300))
@@ -0,0 +1,134 @@
+import functools
+import threading
+import time
+from src.utils.config import Config
+
+
+# Span timings and counters for the hot path. When disabled, span() hands back a shared
+# no-op object and count() returns immediately, so the calls can stay in place.
+class Metrics:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.spans = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            stats = self.spans.get(name)
+            if stats is None:
+                stats = self.spans[name] = {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0}
+            stats["count"] += 1
+            stats["total"] += seconds
+            stats["last"] = seconds
+            if seconds > stats["max"]:
+                stats["max"] = seconds
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+            self.counters.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "spans": {name: dict(stats) for name, stats in self.spans.items()},
+                "counters": dict(self.counters),
+            }
+
+
+class _Span:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        metrics.record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+metrics = Metrics(enabled=Config.PROFILING)
+_NO_SPAN = _NoSpan()
+
+
+# with span("sheets.fetch"): ...
+def span(name):
+    return _Span(name) if metrics.enabled else _NO_SPAN
+
+# Decorator form of span for whole functions
+def timed(name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+            with _Span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def count(name, value=1):
+    if metrics.enabled:
+        metrics.count(name, value)
+
+def enable(enabled=True):
+    metrics.enabled = enabled
+
+def reset():
+    metrics.reset()
+
+# Plain-text table of spans (slowest total first) and counters
+def summary():
+    snapshot = metrics.snapshot()
+    if not snapshot["spans"] and not snapshot["counters"]:
+        return "No measurements yet." if metrics.enabled else "Profiling is off (set PROFILING=1)."
+
+    lines = [f"{'stage':<32}{'calls':>7}{'total ms':>11}{'avg ms':>10}{'max ms':>10}"]
+    for name, stats in sorted(snapshot["spans"].items(), key=lambda item: -item[1]["total"]):
+        lines.append(
+            f"{name:<32}{stats['count']:>7}{stats['total'] * 1000:>11.1f}"
+            f"{stats['total'] / stats['count'] * 1000:>10.2f}{stats['max'] * 1000:>10.1f}"
+        )
+    if snapshot["counters"]:
+        lines.append("")
+        lines.extend(f"{name:<32}{value:>7}" for name, value in sorted(snapshot["counters"].items()))
+    return "\n".join(lines)
+
+# Prometheus text exposition format
+def prometheus_text(prefix="sales_bot"):
+    snapshot = metrics.snapshot()
+    lines = [
+        f"# HELP {prefix}_stage_seconds Time spent per stage.",
+        f"# TYPE {prefix}_stage_seconds summary",
+    ]
+    for name, stats in sorted(snapshot["spans"].items()):
+        lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {stats["count"]}')
+        lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {stats["total"]:.6f}')
+    lines.append(f"# HELP {prefix}_stage_seconds_max Slowest single call per stage.")
+    lines.append(f"# TYPE {prefix}_stage_seconds_max gauge")
+    for name, stats in sorted(snapshot["spans"].items()):
+        lines.append(f'{prefix}_stage_seconds_max{{stage="{name}"}} {stats["max"]:.6f}')
+    lines.append(f"# HELP {prefix}_events_total Event counters.")
+    lines.append(f"# TYPE {prefix}_events_total counter")
+    for name, value in sorted(snapshot["counters"].items()):
+        lines.append(f'{prefix}_events_total{{event="{name}"}} {value}')
+    return "\n".join(lines) + "\n"